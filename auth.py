@@ -0,0 +1,76 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from types import SimpleNamespace
+from flask_login import UserMixin
+from werkzeug.security import check_password_hash
+from sqlalchemy.orm import joinedload
+from models import db, RoleMixin, User
+
+
+class SessionUser(RoleMixin, UserMixin):
+    """Detached, read-only view of a logged-in user.
+
+    Carries just what request handlers and templates read from current_user,
+    with branch and year names resolved up front so nothing lazy-loads.
+    """
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.branch_id = user.branch_id
+        self.year_id = user.year_id
+        self.branch = SimpleNamespace(id=user.branch.id, name=user.branch.name) if user.branch else None
+        self.year = SimpleNamespace(id=user.year.id, name=user.year.name) if user.year else None
+
+    def __repr__(self):
+        return f'<SessionUser {self.username} ({self.role})>'
+
+
+def load_session_user(user_id):
+    """Load a user with its branch and year in one query, or None if it is gone"""
+    user = db.session.execute(
+        db.select(User)
+        .options(joinedload(User.branch), joinedload(User.year))
+        .where(User.id == user_id)
+    ).scalar_one_or_none()
+    return SessionUser(user) if user else None
+
+
+class LoginBusy(Exception):
+    """Raised when too many logins are already waiting for a hash worker"""
+
+
+class PasswordVerifier:
+    """Runs password hash checks inline or on a bounded worker pool.
+
+    With LOGIN_HASH_WORKERS > 0 at most that many hashes are computed at
+    once, so a login storm can't take every CPU from the timetable reads;
+    beyond LOGIN_HASH_QUEUE waiting logins, verify() raises LoginBusy.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._slots = None
+
+    def init_app(self, app):
+        workers = app.config.get('LOGIN_HASH_WORKERS', 0)
+        if workers:
+            executor = ProcessPoolExecutor if app.config.get('LOGIN_HASH_EXECUTOR') == 'process' else ThreadPoolExecutor
+            self._pool = executor(max_workers=workers)
+            self._slots = threading.BoundedSemaphore(workers + app.config.get('LOGIN_HASH_QUEUE', 64))
+        app.extensions['password_verifier'] = self
+
+    def verify(self, password_hash, password):
+        """Check password against password_hash"""
+        if self._pool is None:
+            return check_password_hash(password_hash, password)
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            return self._pool.submit(check_password_hash, password_hash, password).result()
+        finally:
+            self._slots.release()
+
+
+password_verifier = PasswordVerifier()
@@ -0,0 +1,140 @@
+import bisect
+import threading
+from models import db, Room, Class
+from cache import cache
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _clock(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def booking(class_obj):
+    """Snapshot of a class as stored in the availability index"""
+    return (class_obj.id, class_obj.weekday, _minutes(class_obj.start_time), _minutes(class_obj.end_time),
+            class_obj.room_id, class_obj.instructor_id)
+
+
+class AvailabilityIndex:
+    """Per-day booked intervals of every room and instructor.
+
+    Loaded from the classes table on first use, then kept current by the
+    class write paths through apply(); bulk changes call reset(). Each
+    (resource, weekday) holds its bookings sorted by start minute, so a
+    free check is a bisect over the few classes of that day. Room
+    capacities are reloaded whenever the rooms table version moves.
+    """
+
+    def __init__(self):
+        self._busy = None  # (kind, id, weekday) -> sorted [(start, end, class_id)]
+        self._rooms = None  # [(capacity, id, name, building)] sorted by capacity
+        self._rooms_version = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # -------- Maintenance --------
+
+    def apply(self, before=None, after=None):
+        """Apply one class change; before/after are booking() snapshots or None"""
+        with self._lock:
+            self._generation += 1
+            if self._busy is None:
+                return
+            if before is not None:
+                for key, interval in self._intervals(before):
+                    slots = self._busy.get(key, [])
+                    if interval in slots:
+                        slots.remove(interval)
+            if after is not None:
+                for key, interval in self._intervals(after):
+                    bisect.insort(self._busy.setdefault(key, []), interval)
+
+    def reset(self):
+        """Forget every booking; they are reloaded on next use"""
+        with self._lock:
+            self._generation += 1
+            self._busy = None
+
+    @staticmethod
+    def _intervals(snapshot):
+        class_id, weekday, start, end, room_id, instructor_id = snapshot
+        if room_id is not None:
+            yield ('room', room_id, weekday), (start, end, class_id)
+        if instructor_id is not None:
+            yield ('instructor', instructor_id, weekday), (start, end, class_id)
+
+    def _bookings(self):
+        with self._lock:
+            if self._busy is not None:
+                return self._busy
+            generation = self._generation
+
+        busy = {}
+        rows = db.session.execute(db.select(Class.id, Class.weekday, Class.start_time, Class.end_time,
+                                            Class.room_id, Class.instructor_id))
+        for row in rows:
+            for key, interval in self._intervals((row.id, row.weekday, _minutes(row.start_time),
+                                                  _minutes(row.end_time), row.room_id, row.instructor_id)):
+                busy.setdefault(key, []).append(interval)
+        for slots in busy.values():
+            slots.sort()
+
+        with self._lock:
+            # A write landed while loading; answer from this copy but don't keep it
+            if generation == self._generation:
+                self._busy = busy
+        return busy
+
+    def _room_list(self):
+        version = cache.table_versions['rooms']
+        with self._lock:
+            if self._rooms is not None and self._rooms_version == version:
+                return self._rooms
+        rooms = sorted((r.capacity or 0, r.id, r.name, r.building)
+                       for r in db.session.execute(db.select(Room.id, Room.name, Room.building, Room.capacity)))
+        with self._lock:
+            self._rooms, self._rooms_version = rooms, version
+        return rooms
+
+    # -------- Queries --------
+
+    @staticmethod
+    def _is_free(slots, start, end):
+        # Only bookings that start before the window ends can overlap it
+        return not any(slot_end > start for _, slot_end, _ in slots[:bisect.bisect_left(slots, (end,))])
+
+    def free_rooms(self, weekday, start_time, end_time, min_capacity=0):
+        """Rooms with at least min_capacity seats and no class overlapping the window"""
+        busy = self._bookings()
+        rooms = self._room_list()
+        start, end = _minutes(start_time), _minutes(end_time)
+        first = bisect.bisect_left(rooms, (min_capacity,))
+        return [{'id': room_id, 'name': name, 'building': building, 'capacity': capacity}
+                for capacity, room_id, name, building in rooms[first:]
+                if self._is_free(busy.get(('room', room_id, weekday), []), start, end)]
+
+    def free_windows(self, kind, resource_id, weekdays, day_start, day_end, min_minutes=0):
+        """Free windows of a room or instructor between day_start and day_end, per weekday"""
+        busy = self._bookings()
+        opens, closes = _minutes(day_start), _minutes(day_end)
+        result = {}
+        for weekday in weekdays:
+            windows = []
+            cursor = opens
+            for start, end, _ in busy.get((kind, resource_id, weekday), []):
+                if start >= closes:
+                    break
+                if start - cursor >= max(min_minutes, 1):
+                    windows.append((cursor, start))
+                cursor = max(cursor, end)
+            if closes - cursor >= max(min_minutes, 1):
+                windows.append((cursor, closes))
+            result[weekday] = [{'start_time': _clock(s), 'end_time': _clock(e)} for s, e in windows]
+        return result
+
+
+availability = AvailabilityIndex()
+cache.on_external_change(availability.reset)
@@ -0,0 +1,234 @@
+"""Latency and throughput benchmark for the Flask app.
+
+Seeds a throwaway SQLite database at the requested scale, then times the
+hot endpoints through the Flask test client and, with --wsgi, through a
+local threaded WSGI server. Results are printed (or written with --output)
+as JSON so runs from different commits can be compared with compare.py.
+
+    python -m benchmarks.bench_app --classes 5000 --users 20000 --output before.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+ADMIN = ('admin', 'admin123')
+STUDENT = ('user0', 'benchmark')
+
+
+def percentiles(samples):
+    """p50/p95/p99 and mean of a list of seconds, in milliseconds"""
+    if len(samples) < 2:
+        samples = samples * 2
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3)
+    }
+
+
+def run_scenario(name, mode, request, iterations, concurrency=1, before_each=None):
+    """Time iterations calls of request(); request returns the HTTP status"""
+    def timed(_):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        status = request()
+        elapsed = time.perf_counter() - start
+        if status >= 400:
+            raise RuntimeError(f'{name} returned HTTP {status}')
+        return elapsed
+
+    request()  # warm up
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(timed, range(iterations)))
+    else:
+        samples = [timed(i) for i in range(iterations)]
+    wall = time.perf_counter() - started
+
+    result = {'name': name, 'mode': mode, 'n': iterations, 'concurrency': concurrency}
+    result.update(percentiles(samples))
+    result['throughput_rps'] = round(iterations / wall, 1)
+    return result
+
+
+def class_filter_urls(branch_id, year_id):
+    """/api/classes with every combination of branch, year and day filters"""
+    urls = []
+    for use_branch, use_year, use_day in itertools.product([False, True], repeat=3):
+        params = {}
+        if use_branch:
+            params['branch_id'] = branch_id
+        if use_year:
+            params['year_id'] = year_id
+        if use_day:
+            params['day'] = 'Wednesday'
+        urls.append('/api/classes' + ('?' + urllib.parse.urlencode(params) if params else ''))
+    return urls
+
+
+def scenarios(seeded):
+    """(name, method, url, credentials) for every benchmarked request"""
+    branch_id, year_id = seeded['branch_ids'][0], seeded['year_ids'][0]
+    items = [
+        ('login', 'POST', '/login', None),
+        ('dashboard:admin', 'GET', '/dashboard', ADMIN),
+        ('dashboard:student', 'GET', '/dashboard', STUDENT),
+        ('dropdown-data', 'GET', '/api/dropdown-data', ADMIN),
+        ('classes:student', 'GET', '/api/classes', STUDENT)
+    ]
+    for url in class_filter_urls(branch_id, year_id):
+        items.append((f'classes:admin {url[len("/api/classes"):] or "(no filters)"}', 'GET', url, ADMIN))
+    return items
+
+
+def bench_test_client(app, seeded, args, before_each):
+    results = []
+    clients = {}
+    for credentials in (ADMIN, STUDENT):
+        client = app.test_client()
+        client.post('/login', data={'username': credentials[0], 'password': credentials[1]})
+        clients[credentials] = client
+
+    for name, method, url, credentials in scenarios(seeded):
+        if method == 'POST':
+            # A fresh client each time, or the session cookie short-circuits the login
+            request = lambda: app.test_client().post(
+                url, data={'username': STUDENT[0], 'password': STUDENT[1]}).status_code
+            iterations = max(1, args.iterations // 10)
+        else:
+            client = clients[credentials]
+            request = lambda client=client, url=url: client.get(url).status_code
+            iterations = args.iterations
+        results.append(run_scenario(name, 'test_client', request, iterations,
+                                    before_each=before_each))
+    return results
+
+
+def bench_wsgi(app, seeded, args, before_each):
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    def opener(credentials=None):
+        handler = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        if credentials:
+            form = urllib.parse.urlencode({'username': credentials[0], 'password': credentials[1]})
+            handler.open(base + '/login', form.encode()).read()
+        return handler
+
+    def call(handler, url, data=None):
+        with handler.open(base + url, data) as response:
+            response.read()
+            return response.status
+
+    results = []
+    openers = {ADMIN: opener(ADMIN), STUDENT: opener(STUDENT)}
+    try:
+        for name, method, url, credentials in scenarios(seeded):
+            if method == 'POST':
+                form = urllib.parse.urlencode({'username': STUDENT[0], 'password': STUDENT[1]}).encode()
+                request = lambda: call(opener(), url, form)
+                iterations = max(1, args.iterations // 10)
+            else:
+                handler = openers[credentials]
+                request = lambda handler=handler, url=url: call(handler, url)
+                iterations = args.iterations
+            results.append(run_scenario(name, 'wsgi', request, iterations,
+                                        concurrency=args.concurrency, before_each=before_each))
+    finally:
+        server.shutdown()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--branches', type=int, default=10)
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--classes', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads in WSGI mode')
+    parser.add_argument('--wsgi', action='store_true', help='also benchmark through a local WSGI server')
+    parser.add_argument('--cold', action='store_true', help='clear the timetable cache before every request')
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='cit-bench-'), 'bench.db')
+    os.environ['FLASK_CONFIG'] = 'production'
+    # Benchmarks hammer the same endpoints from one client
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(database)
+
+    from app import create_app
+    from benchmarks.seed import seed
+    from models import init_db
+
+    app = create_app()
+    init_db(app)
+    with app.app_context():
+        started = time.perf_counter()
+        seeded = seed(args.branches, args.years, args.classes, args.users)
+        seed_seconds = time.perf_counter() - started
+
+    before_each = None
+    if args.cold:
+        from cache import cache
+        before_each = cache.invalidate
+
+    results = bench_test_client(app, seeded, args, before_each)
+    if args.wsgi:
+        results += bench_wsgi(app, seeded, args, before_each)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'scale': {'branches': args.branches, 'years': args.years,
+                      'classes': args.classes, 'users': args.users},
+            'iterations': args.iterations,
+            'cold': args.cold,
+            'seed_seconds': round(seed_seconds, 2)
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Payload size and latency of /api/classes per format and encoding.
+
+Seeds a throwaway SQLite database, then fetches the full class list as
+the default and the compact (?format=compact) JSON, with no compression,
+gzip and (if installed) brotli, and reports body bytes and latency as JSON.
+
+    python -m benchmarks.bench_payload --classes 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from benchmarks.bench_app import ADMIN, run_scenario
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--branches', type=int, default=5)
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--classes', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--cold', action='store_true', help='clear the timetable cache before every request')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    database = os.path.join(tempfile.mkdtemp(prefix='cit-payload-'), 'payload.db')
+    os.environ['FLASK_CONFIG'] = 'production'
+    # Benchmarks hammer the same endpoints from one client
+    os.environ['RATELIMIT_ENABLED'] = '0'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database
+
+    from app import create_app
+    from benchmarks.seed import seed
+    from cache import cache
+    from compression import compressor
+    from models import init_db
+    from serialization import orjson
+
+    app = create_app()
+    init_db(app)
+    with app.app_context():
+        seed(args.branches, args.years, args.classes, users=10)
+
+    client = app.test_client()
+    client.post('/login', data={'username': ADMIN[0], 'password': ADMIN[1]})
+
+    results = []
+    for fmt, url in (('full', '/api/classes'), ('compact', '/api/classes?format=compact')):
+        for encoding in ['identity'] + compressor.encodings():
+            headers = {'Accept-Encoding': encoding}
+            response = client.get(url, headers=headers)
+            request = lambda url=url, headers=headers: client.get(url, headers=headers).status_code
+            result = run_scenario(f'{fmt} {encoding}', 'test_client', request, args.iterations,
+                                  before_each=cache.invalidate if args.cold else None)
+            result['bytes'] = len(response.data)
+            results.append(result)
+
+    report = {
+        'meta': {'classes': args.classes, 'orjson': orjson is not None, 'cold': args.cold},
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Timetable generator benchmark at full-institute scale.
+
+Starts from the default data (five branches, four years), tops it up with
+rooms and per-branch instructors, asks the generator for one semester per
+year for every branch, and reports search time, how many sessions were
+placed and whether the result is clash-free (checked with ClashIndex) as JSON.
+
+    python -m benchmarks.bench_scheduler --subjects 6 --hours 4,4,3,3,3,3 --runs 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from benchmarks.bench_app import percentiles
+
+
+def build_spec(args, branch_ids, modules):
+    """One requirement per subject for every branch and year"""
+    hours = [int(h) for h in args.hours.split(',')]
+    requirements = []
+    for branch_id in branch_ids:
+        for year_id, module_id in sorted(modules.items()):
+            for subject in range(args.subjects):
+                requirements.append({
+                    'subject': f'B{branch_id} Y{year_id} Subject {subject + 1}',
+                    'branch_id': branch_id,
+                    'module_id': module_id,
+                    'hours': hours[subject % len(hours)],
+                    'size': args.size
+                })
+    return {'replace': True, 'requirements': requirements}
+
+
+def verify(classes):
+    """Clashes between generated classes, found independently of the generator"""
+    from clashes import ClashIndex
+    from importer import parse_time
+
+    index = ClashIndex()
+    clashes = 0
+    for number, c in enumerate(classes):
+        slot = (c['day'], parse_time(c['start_time']), parse_time(c['end_time']),
+                c['room_id'], c['instructor_id'], c['branch_id'], c['module_id'])
+        clashes += bool(index.find(*slot))
+        index.add({'row': number}, *slot)
+    return clashes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subjects', type=int, default=6, help='subjects per branch and year')
+    parser.add_argument('--hours', default='4,4,3,3,3,3', help='weekly hours per subject, cycled')
+    parser.add_argument('--size', type=int, default=60, help='students per group')
+    parser.add_argument('--rooms', type=int, default=16, help='rooms of capacity >= size to add')
+    parser.add_argument('--instructors', type=int, default=6, help='instructors to add per branch')
+    parser.add_argument('--budget', type=float, default=30, help='search time budget in seconds')
+    parser.add_argument('--runs', type=int, default=3, help='runs with different random seeds')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    database = os.path.join(tempfile.mkdtemp(prefix='cit-scheduler-'), 'scheduler.db')
+    os.environ['FLASK_CONFIG'] = 'production'
+    os.environ['DATABASE_URL'] = 'sqlite:///' + database
+
+    from app import create_app
+    from models import db, init_db, Branch, Module, Instructor, Room
+    from scheduler import generate_timetable
+
+    app = create_app()
+    init_db(app)
+    runs = []
+    with app.app_context():
+        branch_ids = [b.id for b in Branch.query.order_by(Branch.id)]
+        db.session.add_all(Room(name=f'G{i + 1}', building='Bench', capacity=args.size)
+                           for i in range(args.rooms))
+        db.session.add_all(Instructor(name=f'Instructor {b}-{i + 1}', email=f'bench{b}-{i + 1}@cit.ac.in', branch_id=b)
+                           for b in branch_ids for i in range(args.instructors))
+        db.session.commit()
+        # The first semester of every year
+        modules = {}
+        for module in Module.query.order_by(Module.id):
+            modules.setdefault(module.year_id, module.id)
+
+        spec = build_spec(args, branch_ids, modules)
+        for seed in range(args.runs):
+            result = generate_timetable(spec, time_budget=args.budget, seed=seed)
+            runs.append(dict(result['stats'], seed=seed,
+                             unplaced=sum(u['missing'] for u in result['unplaced']),
+                             clashes=verify(result['classes'])))
+
+    report = {
+        'meta': {'branches': len(branch_ids), 'years': len(modules), 'subjects': args.subjects,
+                 'hours': args.hours, 'rooms_added': args.rooms, 'budget': args.budget,
+                 'requirements': len(spec['requirements'])},
+        'seconds': percentiles([run['seconds'] for run in runs]),
+        'runs': runs
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
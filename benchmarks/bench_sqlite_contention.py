@@ -0,0 +1,145 @@
+"""Multi-threaded SQLite read/write contention benchmark.
+
+Runs the same mix of timetable reads and class updates against two SQLite
+files, one with SQLite's defaults and one with the SQLITE_PRAGMAS from
+config.py (WAL, synchronous=NORMAL, busy timeout, mmap), and reports read
+and write latency, throughput and lock errors for each as JSON.
+
+    python -m benchmarks.bench_sqlite_contention --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import time as clock
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from benchmarks.bench_app import percentiles
+from config import Config
+from database import sqlite_pragma_listener
+from models import db, DAYS
+
+READ = text(
+    'SELECT c.id, c.subject, c.day, c.start_time, c.end_time, r.name, i.name '
+    'FROM classes c LEFT JOIN rooms r ON r.id = c.room_id '
+    'LEFT JOIN instructors i ON i.id = c.instructor_id '
+    'WHERE c.branch_id = :branch ORDER BY c.weekday, c.start_time'
+)
+WRITE = text('UPDATE classes SET subject = :subject WHERE id = :id')
+
+
+def make_engine(path, pragmas):
+    engine = create_engine(f'sqlite:///{path}', pool_size=32, max_overflow=0,
+                           connect_args={'check_same_thread': False})
+    if pragmas:
+        event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
+    return engine
+
+
+def seed(engine, classes, branches):
+    db.metadata.create_all(engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(db.metadata.tables['branches'].insert(),
+                     [{'name': f'Branch {i}', 'code': f'B{i}'} for i in range(1, branches + 1)])
+        conn.execute(db.metadata.tables['rooms'].insert(),
+                     [{'name': f'R{i}', 'capacity': 60} for i in range(1, 101)])
+        conn.execute(db.metadata.tables['classes'].insert(), [{
+            'subject': f'Subject {i}',
+            'day': DAYS[i % 6],
+            'weekday': i % 6,
+            'start_time': clock(8 + i % 9),
+            'end_time': clock(9 + i % 9),
+            'room_id': rng.randint(1, 100),
+            'branch_id': rng.randint(1, branches)
+        } for i in range(classes)])
+
+
+def run(engine, args):
+    """Hammer engine with readers and writers for args.seconds"""
+    stop = time.perf_counter() + args.seconds
+    results = {'read': [], 'write': [], 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+
+    def reader(seed_value):
+        rng = random.Random(seed_value)
+        samples, errors = [], 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(READ, {'branch': rng.randint(1, args.branches)}).fetchall()
+                samples.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['read'] += samples
+            results['read_errors'] += errors
+
+    def writer(seed_value):
+        rng = random.Random(seed_value)
+        samples, errors = [], 0
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    for _ in range(args.batch):
+                        conn.execute(WRITE, {'subject': f'Edited {rng.random()}',
+                                             'id': rng.randint(1, args.classes)})
+                samples.append(time.perf_counter() - start)
+            except OperationalError:
+                errors += 1
+        with lock:
+            results['write'] += samples
+            results['write_errors'] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for kind in ('read', 'write'):
+        samples = results[kind]
+        report[kind] = dict(percentiles(samples) if samples else {},
+                            n=len(samples),
+                            throughput_ops=round(len(samples) / args.seconds, 1),
+                            errors=results[f'{kind}_errors'])
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--classes', type=int, default=5000)
+    parser.add_argument('--branches', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=20, help='updates per write transaction')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='cit-contention-')
+    report = {'meta': vars(args).copy(), 'results': {}}
+    for label, pragmas in (('default', {}), ('tuned', Config.SQLITE_PRAGMAS)):
+        engine = make_engine(os.path.join(workdir, f'{label}.db'), pragmas)
+        seed(engine, args.classes, args.branches)
+        report['results'][label] = run(engine, args)
+        engine.dispose()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
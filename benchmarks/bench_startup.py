@@ -0,0 +1,69 @@
+"""Application startup benchmark.
+
+Starts fresh interpreters that import app.py and call create_app(), as a
+WSGI worker does on boot, and reports how long each step took and how many
+SQL statements ran along the way (expected: none) as JSON.
+
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.bench_app import percentiles
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'queries': len(statements)}))
+'''
+
+
+def probe(env):
+    output = subprocess.check_output([sys.executable, '-c', PROBE], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--database', help='SQLite file to point the app at (default: a temporary file)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args(argv)
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='cit-startup-'), 'startup.db')
+    env = dict(os.environ, FLASK_CONFIG='production',
+               DATABASE_URL='sqlite:///' + os.path.abspath(database))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+
+    runs = [probe(env) for _ in range(args.runs)]
+    report = {
+        'meta': {'runs': args.runs, 'python': sys.version.split()[0]},
+        'results': {
+            'import': percentiles([run['import'] for run in runs]),
+            'create_app': percentiles([run['create_app'] for run in runs]),
+            'total': percentiles([run['import'] + run['create_app'] for run in runs]),
+            'queries': max(run['queries'] for run in runs)
+        }
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
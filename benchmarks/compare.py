@@ -0,0 +1,45 @@
+"""Compare two bench_app.py result files.
+
+    python -m benchmarks.compare before.json after.json [--metric p95_ms] [--threshold 1.2]
+
+Exits non-zero when any scenario got slower than threshold x baseline.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report['meta'], {(r['name'], r['mode']): r for r in report['results']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', default='p95_ms')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='ratio above which a scenario counts as a regression')
+    args = parser.parse_args(argv)
+
+    base_meta, baseline = load(args.baseline)
+    cand_meta, candidate = load(args.candidate)
+    print(f"{args.metric}: {base_meta.get('commit')} -> {cand_meta.get('commit')}")
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key][args.metric], candidate[key][args.metric]
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{key[1]:<12} {key[0]:<60} {before:>10.2f} {after:>10.2f} {ratio:>6.2f}x{flag}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
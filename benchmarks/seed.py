@@ -0,0 +1,70 @@
+"""Synthetic institute generator for benchmarks.
+
+Builds on the defaults written by init_db() and bulk-inserts extra branches,
+modules, rooms, instructors, classes and users so that runs at different
+scales stay reproducible for a given random seed.
+"""
+import random
+from datetime import time
+from werkzeug.security import generate_password_hash
+from models import db, DAYS, User, Branch, Year, Module, Instructor, Room, Class
+
+PASSWORD = 'benchmark'
+ROLES = ['student'] * 90 + ['cr'] * 5 + ['teacher'] * 4 + ['admin']
+
+
+def _top_up(model, count, make):
+    """Insert rows until model has count of them; returns all ids"""
+    existing = db.session.execute(db.select(db.func.count()).select_from(model)).scalar()
+    if existing < count:
+        db.session.execute(db.insert(model), [make(i) for i in range(existing, count)])
+    return list(db.session.execute(db.select(model.id).order_by(model.id)).scalars())
+
+
+def seed(branches=10, years=4, classes=5000, users=20000, rooms=None, instructors=None,
+         random_seed=0):
+    """Bulk-load a synthetic institute of the given size"""
+    rng = random.Random(random_seed)
+    rooms = rooms or max(8, classes // 50)
+    instructors = instructors or max(4, classes // 25)
+
+    branch_ids = _top_up(Branch, branches, lambda i: {'name': f'Branch {i + 1}', 'code': f'B{i + 1}'})
+    year_ids = _top_up(Year, years, lambda i: {'name': f'Year {i + 1}'})
+    module_ids = _top_up(Module, years * 2, lambda i: {'name': f'Semester {i + 1}',
+                                                        'year_id': year_ids[i // 2]})
+    room_ids = _top_up(Room, rooms, lambda i: {'name': f'R{i + 1}', 'building': f'Block {i % 5}',
+                                               'capacity': rng.choice([30, 40, 60, 90])})
+    instructor_ids = _top_up(Instructor, instructors, lambda i: {
+        'name': f'Instructor {i + 1}', 'email': f'instructor{i + 1}@bench.local',
+        'branch_id': rng.choice(branch_ids)})
+
+    weekdays = range(6)
+    rows = []
+    for i in range(classes):
+        weekday = rng.choice(weekdays)
+        hour = rng.randrange(8, 17)
+        rows.append({
+            'subject': f'Subject {i % 200}',
+            'day': DAYS[weekday],
+            'weekday': weekday,
+            'start_time': time(hour),
+            'end_time': time(hour + 1),
+            'room_id': rng.choice(room_ids),
+            'instructor_id': rng.choice(instructor_ids),
+            'module_id': rng.choice(module_ids),
+            'branch_id': rng.choice(branch_ids)
+        })
+    db.session.execute(db.insert(Class), rows)
+
+    # One hash shared by every seeded user keeps seeding fast at 20k users
+    password_hash = generate_password_hash(PASSWORD)
+    db.session.execute(db.insert(User), [{
+        'username': f'user{i}',
+        'password_hash': password_hash,
+        'role': ROLES[i % len(ROLES)],
+        'branch_id': rng.choice(branch_ids),
+        'year_id': rng.choice(year_ids)
+    } for i in range(users)])
+
+    db.session.commit()
+    return {'branch_ids': branch_ids, 'year_ids': year_ids}
@@ -0,0 +1,251 @@
+from collections import defaultdict
+from datetime import time
+from models import db, DAYS, Class, Module, Branch
+from clashes import ClashIndex
+from importer import Lookups, parse_time
+from cache import cache
+from grid import grids
+from availability import availability
+from events import changes
+
+# Fields bulk_update() may change, and the reference table behind each id
+UPDATABLE = ('subject', 'day', 'start_time', 'end_time', 'room_id', 'instructor_id', 'module_id', 'branch_id')
+REFERENCES = {'room_id': 'room', 'instructor_id': 'instructor', 'module_id': 'module', 'branch_id': 'branch'}
+
+SLOT_COLUMNS = (Class.id, Class.subject, Class.day, Class.weekday, Class.start_time, Class.end_time,
+                Class.room_id, Class.instructor_id, Class.module_id, Class.branch_id)
+
+
+def _can_change(user, branch_id):
+    """Same rule as the single-class routes: CRs only touch their own branch"""
+    return not user.is_cr() or branch_id == user.branch_id
+
+
+def _parse_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('Expected a non-empty list of class ids')
+    if not all(isinstance(id_, int) and not isinstance(id_, bool) for id_ in ids):
+        raise ValueError('Class ids must be integers')
+    if len(set(ids)) != len(ids):
+        raise ValueError('Duplicate class ids')
+    return ids
+
+
+def _load(ids):
+    rows = db.session.execute(db.select(*SLOT_COLUMNS).where(Class.id.in_(ids)))
+    return {row.id: row._asdict() for row in rows}
+
+
+def _slot(values):
+    return (values['day'], values['start_time'], values['end_time'], values['room_id'],
+            values['instructor_id'], values['branch_id'], values['module_id'])
+
+
+def _check_clashes(slots, exclude_ids=()):
+    """Clash errors for (ref, values) pairs, against the timetable and each other"""
+    index = ClashIndex.from_database({values['day'] for _, values in slots}, exclude_ids)
+    errors = []
+    for ref, values in slots:
+        conflicts = index.find(*_slot(values))
+        if conflicts:
+            errors.append(dict(ref, error='Class clashes with existing classes', conflicts=conflicts))
+        index.add(ref, *_slot(values))
+    return errors
+
+
+def _written():
+    """Refresh the in-process views after a bulk write"""
+    cache.invalidate('classes')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+
+
+def _updated_values(item, current, lookups):
+    """Column values a bulk update item sets, raising ValueError on bad input"""
+    unknown = set(item) - set(UPDATABLE) - {'id'}
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+
+    values = {}
+    if 'subject' in item:
+        if not str(item['subject'] or '').strip():
+            raise ValueError('Missing subject')
+        values['subject'] = str(item['subject']).strip()
+    if 'day' in item:
+        if item['day'] not in DAYS:
+            raise ValueError(f'Invalid day: {item["day"]!r}')
+        values['day'], values['weekday'] = item['day'], DAYS.index(item['day'])
+    for field in ('start_time', 'end_time'):
+        if field in item:
+            values[field] = parse_time(item[field])
+    for field, kind in REFERENCES.items():
+        if field in item:
+            if item[field] is None:
+                if field == 'branch_id':
+                    raise ValueError('Missing branch')
+                values[field] = None
+            else:
+                values[field] = lookups.resolve(kind, {field: item[field]})
+
+    merged = dict(current, **values)
+    if merged['start_time'] >= merged['end_time']:
+        raise ValueError('Start time must be before end time')
+    return values, merged
+
+
+def bulk_update(user, updates, dry_run=False):
+    """Validate and apply a list of {'id': ..., <field>: <value>} updates in one transaction.
+
+    Every item is checked first, clashes included, against the rest of the
+    timetable and the other items in their new slots; if any item fails,
+    nothing is written. Items setting the same values are applied with one
+    UPDATE ... WHERE id IN (...) per distinct change.
+
+    Returns {'updated': n, 'errors': [{'id': id, 'error': msg}, ...]}.
+    """
+    if not isinstance(updates, list) or not all(isinstance(item, dict) for item in updates):
+        raise ValueError('Expected a list of objects')
+    ids = _parse_ids([item.get('id') for item in updates])
+
+    current = _load(ids)
+    lookups = Lookups()
+    errors = []
+    slots = []
+    groups = defaultdict(list)
+    for item in updates:
+        row = current.get(item['id'])
+        if row is None:
+            errors.append({'id': item['id'], 'error': 'Class not found'})
+            continue
+        try:
+            values, merged = _updated_values(item, row, lookups)
+        except ValueError as e:
+            errors.append({'id': item['id'], 'error': str(e)})
+            continue
+        if not (_can_change(user, row['branch_id']) and _can_change(user, merged['branch_id'])):
+            errors.append({'id': item['id'], 'error': 'Unauthorized'})
+            continue
+        slots.append(({'id': item['id']}, merged))
+        if values:
+            groups[tuple(sorted(values.items()))].append(item['id'])
+
+    errors += _check_clashes(slots, exclude_ids=ids)
+    if errors or dry_run:
+        return {'updated': 0, 'errors': sorted(errors, key=lambda e: e['id'])}
+
+    for values, group_ids in groups.items():
+        db.session.execute(db.update(Class).where(Class.id.in_(group_ids)).values(dict(values))
+                           .execution_options(synchronize_session=False))
+    db.session.commit()
+    if groups:
+        _written()
+    return {'updated': sum(map(len, groups.values())), 'errors': []}
+
+
+def bulk_delete(user, ids, dry_run=False):
+    """Delete a list of classes with one DELETE ... WHERE id IN (...), or none of them.
+
+    Returns {'deleted': n, 'errors': [{'id': id, 'error': msg}, ...]}.
+    """
+    ids = _parse_ids(ids)
+    current = _load(ids)
+    errors = []
+    for id_ in ids:
+        if id_ not in current:
+            errors.append({'id': id_, 'error': 'Class not found'})
+        elif not _can_change(user, current[id_]['branch_id']):
+            errors.append({'id': id_, 'error': 'Unauthorized'})
+    if errors or dry_run:
+        return {'deleted': 0, 'errors': errors}
+
+    db.session.execute(db.delete(Class).where(Class.id.in_(ids))
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    _written()
+    return {'deleted': len(ids), 'errors': []}
+
+
+def _shift_time(value, minutes):
+    total = value.hour * 60 + value.minute + minutes
+    if not 0 <= total < 24 * 60:
+        raise ValueError('Time shift moves the class out of the day')
+    return time(total // 60, total % 60, value.second)
+
+
+def copy_week(branch_id, module_id, target_module_id, day_shift=0, time_shift=0,
+              replace=False, dry_run=False):
+    """Copy a branch's week of classes from one module to another.
+
+    Days move by day_shift and times by time_shift minutes. The copies are
+    checked for clashes in memory; if any clashes, nothing is written.
+    Otherwise they are written with a single INSERT ... SELECT over the
+    source week, the shifts expressed as CASE mappings of its distinct
+    weekdays and times. With replace, the branch's classes already in the
+    target module are deleted first and not counted as clashes.
+
+    Returns {'inserted': n, 'replaced': n, 'errors': [{'id': source id, 'error': msg}, ...]}.
+    """
+    for name, value in (('branch_id', branch_id), ('module_id', module_id),
+                        ('target_module_id', target_module_id), ('day_shift', day_shift),
+                        ('time_shift', time_shift)):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f'{name} must be an integer')
+    if db.session.get(Branch, branch_id) is None:
+        raise ValueError(f'Unknown branch_id: {branch_id}')
+    for id_ in (module_id, target_module_id):
+        if db.session.get(Module, id_) is None:
+            raise ValueError(f'Unknown module_id: {id_}')
+    if module_id == target_module_id and (replace or not (day_shift or time_shift)):
+        raise ValueError('Copying a week onto itself needs a day or time shift and no replace')
+
+    source = db.session.execute(db.select(*SLOT_COLUMNS).where(
+        Class.branch_id == branch_id, Class.module_id == module_id).order_by(Class.id)).all()
+    if not source:
+        raise ValueError('No classes to copy')
+    replaced = list(db.session.execute(db.select(Class.id).where(
+        Class.branch_id == branch_id, Class.module_id == target_module_id)).scalars()) if replace else []
+
+    errors = []
+    slots = []
+    days, times = {}, {}
+    for row in source:
+        weekday = row.weekday + day_shift
+        if not 0 <= weekday < len(DAYS):
+            errors.append({'id': row.id, 'error': 'Day shift moves the class out of the week'})
+            continue
+        try:
+            for value in (row.start_time, row.end_time):
+                times[value] = _shift_time(value, time_shift)
+        except ValueError as e:
+            errors.append({'id': row.id, 'error': str(e)})
+            continue
+        days[row.weekday] = weekday
+        slots.append(({'id': row.id}, dict(row._asdict(), day=DAYS[weekday], module_id=target_module_id,
+                                           start_time=times[row.start_time], end_time=times[row.end_time])))
+
+    # When copying within a module, the source classes still hold their old slots
+    errors += _check_clashes(slots, exclude_ids=replaced)
+    if errors or dry_run:
+        return {'inserted': 0, 'replaced': 0, 'errors': sorted(errors, key=lambda e: e['id'])}
+
+    if replaced:
+        db.session.execute(db.delete(Class).where(Class.id.in_(replaced))
+                           .execution_options(synchronize_session=False))
+    copies = db.select(
+        Class.subject,
+        db.case({old: DAYS[new] for old, new in days.items()}, value=Class.weekday) if day_shift else Class.day,
+        Class.weekday + day_shift,
+        db.case(times, value=Class.start_time) if time_shift else Class.start_time,
+        db.case(times, value=Class.end_time) if time_shift else Class.end_time,
+        Class.room_id,
+        Class.instructor_id,
+        db.literal(target_module_id),
+        Class.branch_id
+    ).where(Class.branch_id == branch_id, Class.module_id == module_id).order_by(Class.id)
+    result = db.session.execute(db.insert(Class).from_select(
+        ['subject', 'day', 'weekday', 'start_time', 'end_time', 'room_id', 'instructor_id', 'module_id',
+         'branch_id'], copies))
+    db.session.commit()
+    _written()
+    return {'inserted': result.rowcount, 'replaced': len(replaced), 'errors': []}
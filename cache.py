@@ -0,0 +1,227 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import data_version, committed_change_seq
+
+
+class TimetableCache:
+    """In-process LRU cache of serialized timetable reads.
+
+    Every entry is tagged with the global data version it was built from.
+    Write paths call invalidate() with the tables they changed, which bumps
+    the global and per-table versions and drops all entries, so a reader
+    never sees data older than the last commit made by this process.
+
+    Writes made by other worker processes are noticed through the
+    database's data version (models.data_version), read at most every
+    CACHE_VERSION_CHECK_SECONDS before a request. When it moved past the
+    commits of this process, everything is dropped and the callbacks
+    registered with on_external_change() rebuild their own state.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.version = 0
+        self.table_versions = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.external_changes = 0
+        self.shared_version = None  # database data version this process is up to date with
+        self._checked_at = 0.0
+        self._listeners = []
+        self._engine_hooked = False
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read cache settings from the app config"""
+        self.max_entries = app.config.get('TIMETABLE_CACHE_SIZE', self.max_entries)
+        app.config.setdefault('CACHE_VERSION_CHECK_SECONDS', 1.0)
+        app.before_request(self._before_request)
+        if not self._engine_hooked:
+            event.listen(Engine, 'commit', self._committed)
+            self._engine_hooked = True
+        app.extensions['timetable_cache'] = self
+
+    def on_external_change(self, callback):
+        """Call callback() whenever another process is found to have changed the data"""
+        self._listeners.append(callback)
+        return callback
+
+    def get_or_set(self, key, loader):
+        """Return the cached value for key, building it with loader on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            version = self.version
+
+        value = loader()
+
+        with self._lock:
+            # Don't store a result that was built across an invalidation
+            if version == self.version and self.max_entries > 0:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *tables):
+        """Bump the data version of tables and drop every cached entry"""
+        with self._lock:
+            self.version += 1
+            for table in tables:
+                self.table_versions[table] += 1
+            self._entries.clear()
+
+    # -------- Shared data version --------
+
+    def _before_request(self):
+        if request.endpoint != 'static':
+            self.check_version()
+
+    def check_version(self, force=False):
+        """Re-read the database's data version unless it was read recently.
+
+        Returns the version read, or the one last seen if the check was
+        skipped.
+        """
+        with self._lock:
+            interval = current_app.config['CACHE_VERSION_CHECK_SECONDS']
+            if not force and self.shared_version is not None and time.monotonic() - self._checked_at < interval:
+                return self.shared_version
+            self._checked_at = time.monotonic()
+
+        version = data_version()
+        with self._lock:
+            known = self.shared_version
+            if known is not None and (version == known or (version[0] == known[0] and version[1] < known[1])):
+                # Unchanged, or read from a replica that is behind
+                return version
+            self.shared_version = version
+            if known is None:
+                return version
+            self.version += 1
+            for table in self.table_versions:
+                self.table_versions[table] += 1
+            self._entries.clear()
+            self.external_changes += 1
+        for callback in self._listeners:
+            callback()
+        return version
+
+    def _committed(self, connection):
+        # A commit of our own that directly follows the version we know about
+        # is covered by the write path's invalidate(); anything else is left
+        # for the next check to find
+        seq = committed_change_seq(connection)
+        if seq is None:
+            return
+        with self._lock:
+            if self.shared_version is not None and self.shared_version[1] == seq - 1:
+                self.shared_version = (self.shared_version[0], seq)
+
+    def etag(self, tables, *parts):
+        """ETag value for a response built from tables and request parts.
+
+        Built from the data version read from the database just now, not
+        from this process's table versions, so a tag never matches data
+        another process has changed since. Any write changes every tag.
+        """
+        version = self.check_version(force=True)
+        seed = repr((version, sorted(tables)) + parts).encode()
+        return hashlib.sha1(seed).hexdigest()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'version': self.version,
+                'table_versions': dict(self.table_versions),
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'external_changes': self.external_changes,
+                'shared_version': '-'.join(map(str, self.shared_version)) if self.shared_version else None
+            }
+
+
+class UserCache:
+    """Bounded, TTL'd cache of session users, keyed by user id.
+
+    Each id carries a version that invalidate() bumps, so a load that
+    raced a change to the user is never stored. The TTL bounds how long
+    other worker processes can serve a user that was changed elsewhere.
+    """
+
+    def __init__(self, max_entries=4096, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._versions = defaultdict(int)
+        self._entries = OrderedDict()  # user_id -> (expires_at, version, user)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read cache settings from the app config"""
+        self.max_entries = app.config.get('USER_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id, loader):
+        """Return the cached user, loading it with loader(user_id) when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            version = self._versions[user_id]
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        user = loader(user_id)
+
+        with self._lock:
+            if version == self._versions[user_id] and self.max_entries > 0:
+                self._entries[user_id] = (now + self.ttl, version, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        """Drop one user, e.g. after it was deleted or its role or branch changed"""
+        with self._lock:
+            self._versions[user_id] += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Drop every user, e.g. after a branch or year they point at was removed"""
+        with self._lock:
+            for user_id in self._entries:
+                self._versions[user_id] += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+cache = TimetableCache()
+user_cache = UserCache()
+# Users changed by another process are reloaded without waiting for the TTL
+cache.on_external_change(user_cache.clear)
@@ -0,0 +1,92 @@
+import gzip
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is offered without it
+    brotli = None
+
+
+class Compressor:
+    """gzip/brotli encoding of JSON and HTML responses.
+
+    Bodies of at least COMPRESS_MIN_SIZE bytes are compressed with the
+    best encoding the client accepts. Streamed responses (exports, SSE)
+    are passed through untouched so they keep flowing.
+
+    Responses with an ETag are the cached timetable reads; their encoded
+    bodies are kept in a small LRU keyed by (ETag, encoding), so a hot
+    payload is compressed once per data version rather than per request.
+    Strong ETags get the encoding appended, e.g. "abc-gzip".
+    """
+
+    def __init__(self, max_entries=256):
+        self.min_size = 1024
+        self.level = 6
+        self.brotli_quality = 4
+        self.mimetypes = {'application/json', 'text/html'}
+        self.max_entries = max_entries
+        self._encoded = OrderedDict()  # (etag, encoding) -> body
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read compression settings from the app config"""
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        self.mimetypes = set(app.config.get('COMPRESS_MIMETYPES', self.mimetypes))
+        self.max_entries = app.config.get('COMPRESS_CACHE_SIZE', self.max_entries)
+        app.after_request(self._after_request)
+        app.extensions['compressor'] = self
+
+    def encodings(self):
+        """Encodings this server can produce, preferred first"""
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def _after_request(self, response):
+        if (response.mimetype not in self.mimetypes or response.is_streamed
+                or response.direct_passthrough or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        response.set_data(self._encode(etag, data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        if etag is not None and not weak:
+            # A strong tag names exact bytes, so each encoding gets its own
+            response.set_etag(f'{etag}-{encoding}')
+        return response
+
+    def _encode(self, etag, data, encoding):
+        if etag is None or self.max_entries <= 0:
+            return self.compress(data, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            if key in self._encoded:
+                self._encoded.move_to_end(key)
+                return self._encoded[key]
+
+        body = self.compress(data, encoding)
+        with self._lock:
+            self._encoded[key] = body
+            while len(self._encoded) > self.max_entries:
+                self._encoded.popitem(last=False)
+        return body
+
+
+compressor = Compressor()
@@ -1,28 +1,135 @@
 import os
 
+
+def server_pool_options(uri):
+    """Connection pool settings for server databases.
+
+    SQLite is tuned through SQLITE_PRAGMAS on connect instead, and its
+    in-memory databases must keep SQLAlchemy's single-connection pool.
+    """
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # below typical server idle timeouts
+        'pool_pre_ping': True
+    }
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of read replica URLs"""
+    return {f'replica{i}': url.strip() for i, url in enumerate((urls or '').split(',')) if url.strip()}
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Applied to every new SQLite connection (file databases only).
+    # WAL lets readers proceed while a writer commits.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms to wait for a lock instead of failing
+        'mmap_size': 268435456,  # 256 MB
+        'cache_size': -65536  # 64 MB
+    }
+    
+    # Read replicas, e.g. DATABASE_REPLICA_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get('DATABASE_REPLICA_URLS'))
+    REPLICA_STICKY_SECONDS = 5  # read from the primary this long after a write (expected replica lag)
+    REPLICA_RETRY_SECONDS = 30  # skip a failed replica this long
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
+    
+    # Password hashing; existing hashes are upgraded on the user's next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt'  # e.g. 'pbkdf2:sha256:600000'
+    PASSWORD_SALT_LENGTH = 16
+    # Verify login passwords on a bounded pool (0 = inline in the request thread)
+    LOGIN_HASH_WORKERS = 0
+    LOGIN_HASH_EXECUTOR = 'thread'  # 'thread' or 'process'
+    LOGIN_HASH_QUEUE = 64  # logins waiting for a worker before we answer 503
+    
+    # Timetable cache configuration
+    # Caches, weekly grids and the availability index live in each worker process.
+    # A worker notices writes made by the others through the data version in the
+    # sync_state table, read at most this often; it bounds how stale a worker can be.
+    CACHE_VERSION_CHECK_SECONDS = 1.0  # 0 = check before every request
+    TIMETABLE_CACHE_SIZE = 1024  # max cached query results per process
+    USER_CACHE_SIZE = 4096  # max cached session users per process
+    USER_CACHE_TTL = 60  # seconds before a cached session user is reloaded
+    
+    # Response compression (brotli needs the optional 'brotli' package)
+    COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies are sent as is
+    COMPRESS_LEVEL = 6  # gzip level
+    COMPRESS_BROTLI_QUALITY = 4  # 0-11; higher is smaller but much slower
+    COMPRESS_MIMETYPES = ['application/json', 'text/html']
+    COMPRESS_CACHE_SIZE = 256  # encoded bodies of ETagged responses kept per process
+    
+    # Live change events (/api/changes)
+    # Every open dashboard holds a worker thread for up to SSE_MAX_STREAM_SECONDS, so only
+    # turn this on with a threaded or gevent worker (e.g. gunicorn -k gevent), never a small
+    # pool of sync workers. Changes made by other workers arrive as a reload.
+    LIVE_UPDATES = os.environ.get('LIVE_UPDATES') == '1'
+    CHANGE_LOG_SIZE = 1000  # recent changes kept for clients resuming with Last-Event-ID
+    SSE_KEEPALIVE_SECONDS = 15
+    SSE_POLL_SECONDS = 2  # how often open streams look for changes made by other workers
+    SSE_MAX_STREAM_SECONDS = 300  # streams end after this long and the browser reconnects
+    
+    # Timetable generator (/api/timetable/generate)
+    TIMETABLE_GENERATOR_BUDGET = 10  # max seconds of search per request
+    
+    # Dashboard rendering
+    TEMPLATE_BYTECODE_CACHE = True  # keep compiled templates on disk
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')  # default: a private temp dir
+    
+    # Workload reports (/api/reports/*); room occupancy is measured against this week
+    REPORT_TEACHING_DAYS = 6
+    REPORT_TEACHING_HOURS = 8  # per day
+    
+    # Bulk class operations (/api/classes/bulk-update, /api/classes/bulk-delete)
+    BULK_MAX_CLASSES = 1000  # max classes per request
+    
+    # Rate limiting: token buckets per user (or client address) and endpoint group
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') != '0'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL')  # e.g. redis://localhost:6379/0; default: per process
+    RATELIMITS = {
+        'login': '10/minute',  # login and registration attempts per username and client address
+        'login_address': '600/minute',  # all attempts from one address; a campus NAT is one address
+        'read': '300/minute',
+        'write': '120/minute',
+        'heavy': '10/minute',  # exports, imports, generator runs, bulk operations and reports
+    }
+    # Behind a reverse proxy every request comes from the proxy's address and would share
+    # its limits: set this to the number of proxies whose X-Forwarded-For can be trusted
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    
+    # Instrumentation
+    SERVER_TIMING = False  # add a Server-Timing header to every response
+    QUERY_BUDGET = 10  # log requests that run more SQL statements than this
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics, if set
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///cit_routine.db'
-    SQLALCHEMY_ECHO = True
+    # Per-statement logging is slow; /metrics and Server-Timing cover day-to-day needs
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO') == '1'
+    SERVER_TIMING = True
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///cit_routine.db'
+    SQLALCHEMY_ENGINE_OPTIONS = server_pool_options(SQLALCHEMY_DATABASE_URI)
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    RATELIMIT_ENABLED = False
 
 # Configuration dictionary
 config = {
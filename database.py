@@ -0,0 +1,27 @@
+from sqlalchemy import event
+from models import db
+
+
+def sqlite_pragma_listener(pragmas):
+    """'connect' listener that applies PRAGMAs to each new SQLite connection"""
+    statements = [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return on_connect
+
+
+def init_engine(app):
+    """Tune the app's engines once Flask-SQLAlchemy has created them"""
+    with app.app_context():
+        engines = list(db.engines.values())
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    for engine in engines:
+        if pragmas and engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
@@ -0,0 +1,51 @@
+from functools import wraps
+from flask import request, make_response, current_app
+from flask_login import current_user
+from cache import cache
+from compression import compressor
+from queries import user_scope
+
+
+def _matching_tag(etag):
+    """The representation of etag the client already holds, if any"""
+    # Encoded bodies carry the tag with their encoding appended, see Compressor
+    for tag in [etag] + [f'{etag}-{encoding}' for encoding in compressor.encodings()]:
+        if request.if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+
+def conditional_get(*tables, admin_only=False):
+    """Serve GETs with an ETag over tables and answer If-None-Match with 304.
+
+    The tag covers the database's data version, the full request path and
+    the caller's role scope, so a match costs one primary-key read of
+    sync_state and never runs the view. Tags are strong: the compressor
+    gives each encoding of a body its own tag.
+
+    With admin_only, other users go straight to the view, which refuses
+    them, without the data version being read.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if request.method != 'GET' or (admin_only and not current_user.is_admin()):
+                return view(*args, **kwargs)
+
+            etag = cache.etag(tables, request.full_path,
+                              current_user.role, user_scope(current_user))
+            matched = _matching_tag(etag)
+            if matched is not None:
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapped
+    return decorator
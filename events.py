@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from models import db
+from cache import cache
+
+
+def sse_message(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f'id: {event_id}'] if event_id else []
+    lines += [f'event: {event}', f'data: {data}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def scope_filter(branch_id=None, year_id=None):
+    """Whether a (branch_id, year_id) grid key is inside a subscriber's scope"""
+    def visible(key):
+        return (key is not None
+                and (branch_id is None or key[0] == branch_id)
+                and (year_id is None or key[1] == year_id))
+    return visible
+
+
+class ChangeFeed:
+    """Bounded in-memory log of class changes, streamed as Server-Sent Events.
+
+    Write paths publish one event per changed class with the same
+    before/after (key, class) pairs they hand to the weekly grids. Each
+    subscriber only gets events for its own branch/year scope: a class
+    that moved out of scope arrives as a deletion, one that moved in as a
+    creation. Event ids carry a per-process epoch, so a client reconnecting
+    with a Last-Event-ID this log no longer covers (too old, or from before
+    a restart) is told to reload instead of silently missing changes.
+
+    The log only holds this process's writes. Open streams check the
+    database's data version every SSE_POLL_SECONDS, and a change made by
+    another worker reaches them as a reset.
+    """
+
+    def __init__(self, max_events=1000):
+        self.max_events = max_events
+        self.keepalive = 15
+        self.poll_seconds = 2
+        self.max_stream_seconds = 300
+        self.epoch = os.urandom(4).hex()
+        self._events = deque(maxlen=max_events)  # (seq, event, before_key, after_key, data, deleted_data)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    def init_app(self, app):
+        """Read feed settings from the app config"""
+        self.max_events = app.config.get('CHANGE_LOG_SIZE', self.max_events)
+        app.config.setdefault('LIVE_UPDATES', False)
+        self.keepalive = app.config.get('SSE_KEEPALIVE_SECONDS', self.keepalive)
+        self.poll_seconds = app.config.get('SSE_POLL_SECONDS', self.poll_seconds)
+        self.max_stream_seconds = app.config.get('SSE_MAX_STREAM_SECONDS', self.max_stream_seconds)
+        with self._condition:
+            self._events = deque(self._events, maxlen=self.max_events)
+        app.extensions['change_feed'] = self
+
+    def publish(self, before=None, after=None):
+        """Record one class change; before/after are (key, serialized class) pairs or None"""
+        deleted = {'id': (after or before)[1]['id']}
+        data = dict(deleted, **{'class': after[1]}) if after else deleted
+        self._append('change', before[0] if before else None, after[0] if after else None,
+                     json.dumps(data, separators=(',', ':')), json.dumps(deleted, separators=(',', ':')))
+
+    def reset(self):
+        """Tell every subscriber to reload, after changes too broad to send one by one"""
+        self._append('reset', None, None, '{}', '{}')
+
+    def _append(self, event, before_key, after_key, data, deleted_data):
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, event, before_key, after_key, data, deleted_data))
+            self._condition.notify_all()
+
+    def last_event_id(self):
+        """Id of the newest change, for pages that subscribe after rendering"""
+        with self._condition:
+            return f'{self.epoch}-{self._seq}'
+
+    def _resume_from(self, last_event_id):
+        """Sequence number to resume after, or None if the client must reload"""
+        with self._condition:
+            if not last_event_id:
+                return self._seq
+            epoch, _, seq = last_event_id.partition('-')
+            if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+                return None
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            return int(seq) if int(seq) >= oldest - 1 else None
+
+    def _since(self, seq):
+        """Events after seq, or None if some of them were already dropped"""
+        with self._condition:
+            if seq == self._seq:
+                self._condition.wait(min(self.poll_seconds, self.keepalive))
+            if not self._events or seq >= self._seq:
+                return []
+            first = self._events[0][0]
+            if seq < first - 1:
+                return None
+            return list(self._events)[seq - first + 1:]
+
+    @staticmethod
+    def _check_other_workers():
+        # A change found here is published as a reset (see cache.on_external_change below).
+        # The stream's transaction is ended so the next check sees new commits.
+        try:
+            cache.check_version()
+        finally:
+            db.session.remove()
+
+    def stream(self, visible, last_event_id=None):
+        """SSE messages for one subscriber; visible(key) filters by scope.
+
+        Runs in the request context (stream_with_context), as it reads the
+        data version.
+        """
+        seq = self._resume_from(last_event_id)
+        if seq is None:
+            seq = self._seq
+            yield sse_message('reset', '{}', f'{self.epoch}-{seq}')
+        # Give the client an id to resume from even if nothing happens before it reconnects
+        yield f'retry: 3000\nid: {self.epoch}-{seq}\n\n'
+
+        deadline = time.monotonic() + self.max_stream_seconds
+        keepalive_at = time.monotonic() + self.keepalive
+        while time.monotonic() < deadline:
+            self._check_other_workers()
+            events = self._since(seq)
+            if events is None:
+                # This subscriber fell behind the log
+                seq = self._seq
+                yield sse_message('reset', '{}', f'{self.epoch}-{seq}')
+                continue
+            if not events:
+                if time.monotonic() >= keepalive_at:
+                    keepalive_at = time.monotonic() + self.keepalive
+                    yield ': keepalive\n\n'
+                continue
+            for seq, event, before_key, after_key, data, deleted_data in events:
+                event_id = f'{self.epoch}-{seq}'
+                if event == 'reset':
+                    yield sse_message('reset', data, event_id)
+                elif visible(after_key):
+                    yield sse_message('updated' if visible(before_key) else 'created', data, event_id)
+                elif visible(before_key):
+                    yield sse_message('deleted', deleted_data, event_id)
+                else:
+                    # No data, but moves the client's Last-Event-ID past this change
+                    yield f'id: {event_id}\n\n'
+
+
+changes = ChangeFeed()
+cache.on_external_change(changes.reset)
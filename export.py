@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from models import DAYS
+from queries import serialize_class
+
+# Rows fetched per round trip while streaming
+BATCH_SIZE = 1000
+
+CSV_FIELDS = ['id', 'subject', 'day', 'start_time', 'end_time', 'room', 'instructor', 'module', 'branch']
+ICAL_DAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+
+def iter_classes(query):
+    """Serialize a class query row by row using a server-side cursor"""
+    rows = query.execution_options(stream_results=True).yield_per(BATCH_SIZE)
+    for c in rows:
+        yield serialize_class(c)
+
+
+def ndjson_lines(query):
+    """One JSON object per line"""
+    for row in iter_classes(query):
+        yield json.dumps(row) + '\n'
+
+
+def csv_lines(query):
+    """CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in iter_classes(query):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ical_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ical_lines(query, calendar_name, today=None):
+    """Weekly recurring VEVENTs, anchored on the week containing today"""
+    today = today or date.today()
+    monday = today - timedelta(days=today.weekday())
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+
+    yield ('BEGIN:VCALENDAR\r\n'
+           'VERSION:2.0\r\n'
+           'PRODID:-//CIT Kokrajhar//Class Routine//EN\r\n'
+           f'X-WR-CALNAME:{_ical_text(calendar_name)}\r\n')
+    for row in iter_classes(query):
+        if row['day'] not in DAYS:
+            continue
+        weekday = DAYS.index(row['day'])
+        day = (monday + timedelta(days=weekday)).strftime('%Y%m%d')
+        location = row['room'] or ''
+        yield ('BEGIN:VEVENT\r\n'
+               f'UID:class-{row["id"]}@cit-routine\r\n'
+               f'DTSTAMP:{stamp}\r\n'
+               f'DTSTART:{day}T{row["start_time"].replace(":", "")}00\r\n'
+               f'DTEND:{day}T{row["end_time"].replace(":", "")}00\r\n'
+               f'RRULE:FREQ=WEEKLY;BYDAY={ICAL_DAYS[weekday]}\r\n'
+               f'SUMMARY:{_ical_text(row["subject"])}\r\n'
+               f'LOCATION:{_ical_text(location)}\r\n'
+               f'DESCRIPTION:{_ical_text(row["instructor"] or "")}\r\n'
+               'END:VEVENT\r\n')
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,34 @@
+import os
+from flask import render_template
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from cache import cache
+
+
+class TemplateFragments:
+    """Rendered template fragments, kept in the timetable cache.
+
+    A fragment is cached under its template name and a key covering
+    everything besides the data that changes its output (role, filters).
+    Every write empties the timetable cache, so a fragment is never older
+    than the last commit made by this process. Compiled templates are also
+    kept on disk, so new workers load them instead of compiling again.
+    """
+
+    def init_app(self, app):
+        """Turn on the template bytecode cache unless disabled in the config"""
+        if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+            directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Without a directory Jinja uses a private one under the temp dir
+            app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(directory))
+        app.extensions['template_fragments'] = self
+
+    def render(self, template, key, context):
+        """template rendered with context() once per key and data version"""
+        return cache.get_or_set(('fragment', template) + tuple(key),
+                                lambda: Markup(render_template(template, **context())))
+
+
+fragments = TemplateFragments()
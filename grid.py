@@ -0,0 +1,118 @@
+import threading
+from sqlalchemy.orm import joinedload
+from models import db, DAYS, Module, Class
+from cache import cache
+
+
+def grid_key(class_obj):
+    """(branch_id, year_id) grid a class belongs to"""
+    return (class_obj.branch_id, class_obj.module.year_id if class_obj.module else None)
+
+
+def grid_entry(class_obj):
+    """Snapshot of a class as stored in a weekly grid"""
+    return {
+        'id': class_obj.id,
+        'subject': class_obj.subject,
+        'weekday': class_obj.weekday,
+        'start_time': class_obj.start_time.strftime('%H:%M'),
+        'end_time': class_obj.end_time.strftime('%H:%M'),
+        'room': class_obj.room.name if class_obj.room else None,
+        'instructor': class_obj.instructor.name if class_obj.instructor else None,
+        'module_id': class_obj.module_id,
+        'module': class_obj.module.name if class_obj.module else None
+    }
+
+
+class WeeklyGrids:
+    """Materialized day x time-slot routine per (branch, year).
+
+    A grid is loaded from the database the first time it is asked for and
+    then kept up to date in memory: a single class write moves one entry
+    between grids and re-renders only the grids it touched. Changes to
+    reference tables drop everything via reset().
+    """
+
+    def __init__(self):
+        self._entries = {}  # key -> {class_id: entry}
+        self._rendered = {}  # key -> rendered grid
+        self._generation = 0  # bumped by every change, to spot loads that raced one
+        self._lock = threading.Lock()
+
+    def get(self, branch_id, year_id):
+        """Rendered grid for a branch and year (None for classes without a module)"""
+        key = (branch_id, year_id)
+        with self._lock:
+            if key in self._rendered:
+                return self._rendered[key]
+            generation = self._generation
+
+        entries = {e['id']: e for e in self._load(branch_id, year_id)}
+        with self._lock:
+            if generation != self._generation:
+                # A write landed while loading; serve this result but don't keep it
+                return self._render(key, entries)
+            self._entries[key] = entries
+            self._rendered[key] = self._render(key, entries)
+            return self._rendered[key]
+
+    def apply(self, before=None, after=None):
+        """Apply one class change; before/after are (key, entry) pairs or None"""
+        with self._lock:
+            self._generation += 1
+            if before is not None:
+                key, entry = before
+                if key in self._entries:
+                    self._entries[key].pop(entry['id'], None)
+                    self._rendered[key] = self._render(key, self._entries[key])
+            if after is not None:
+                key, entry = after
+                if key in self._entries:
+                    self._entries[key][entry['id']] = entry
+                    self._rendered[key] = self._render(key, self._entries[key])
+
+    def reset(self):
+        """Forget every grid; they are reloaded on next use"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._rendered.clear()
+
+    @staticmethod
+    def _load(branch_id, year_id):
+        query = Class.query.options(
+            joinedload(Class.room),
+            joinedload(Class.instructor),
+            joinedload(Class.module)
+        ).filter(Class.branch_id == branch_id)
+        if year_id is None:
+            query = query.filter(Class.module_id.is_(None))
+        else:
+            query = query.filter(Class.module_id.in_(
+                db.select(Module.id).where(Module.year_id == year_id)))
+        return [grid_entry(c) for c in query]
+
+    @staticmethod
+    def _render(key, entries):
+        # Rows migrated with an unknown day name have no column to go in
+        ordered = sorted((e for e in entries.values() if e['weekday'] < len(DAYS)),
+                         key=lambda e: (e['weekday'], e['start_time'], e['id']))
+        time_slots = sorted({(e['start_time'], e['end_time']) for e in ordered})
+        columns = {slot: i for i, slot in enumerate(time_slots)}
+        weekdays = sorted({e['weekday'] for e in ordered} | set(range(6)))
+
+        rows = {DAYS[w]: [[] for _ in time_slots] for w in weekdays}
+        for e in ordered:
+            rows[DAYS[e['weekday']]][columns[(e['start_time'], e['end_time'])]].append(e)
+
+        return {
+            'branch_id': key[0],
+            'year_id': key[1],
+            'days': [DAYS[w] for w in weekdays],
+            'time_slots': [{'start_time': s, 'end_time': e} for s, e in time_slots],
+            'grid': rows
+        }
+
+
+grids = WeeklyGrids()
+cache.on_external_change(grids.reset)
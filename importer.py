@@ -0,0 +1,235 @@
+import csv
+import io
+import json
+import re
+from datetime import time
+from models import db, DAYS, Branch, Module, Instructor, Room, Class
+from clashes import ClashIndex
+from cache import cache
+from grid import grids
+from events import changes
+from availability import availability
+
+TITLE_PREFIX = re.compile(r'^(dr|prof|mr|mrs|ms)\.?\s+', re.IGNORECASE)
+TIME_PATTERN = re.compile(r'^(\d{1,2})(?:[:.](\d{2}))?(?::\d{2}(?:\.\d+)?)?\s*(am|pm)?$', re.IGNORECASE)
+
+# Marks a name shared by several rows, which can't be resolved to one id
+AMBIGUOUS = -1
+
+
+def parse_rows(text, fmt=None):
+    """Parse an import payload into row dicts.
+
+    fmt is 'json' (an array, or an object with a 'classes' array, as in
+    class_routine.json), 'jsonl' (one object per line) or 'csv' with a header
+    row. When fmt is None it is guessed from the first character. Items
+    that aren't objects are left for import_classes() to report per row.
+    """
+    if fmt is None:
+        head = text.lstrip()[:1]
+        fmt = 'json' if head in ('[', '{') else 'csv'
+
+    if fmt == 'json':
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError:
+            # Several objects on separate lines
+            return parse_rows(text, 'jsonl')
+        if isinstance(rows, dict):
+            rows = rows['classes'] if 'classes' in rows else [rows]
+        if not isinstance(rows, list):
+            raise ValueError('Expected an array of rows')
+        return rows
+    if fmt == 'jsonl':
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f'Invalid JSON on line {number}: {e.msg}')
+        return rows
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(text)))
+    raise ValueError(f'Unknown import format: {fmt}')
+
+
+def parse_time(value):
+    """Parse '10:00', '10:00:00', '10 am' or '1:30 pm' into a time"""
+    match = TIME_PATTERN.match(str(value).strip())
+    if not match:
+        raise ValueError(f'Invalid time: {value!r}')
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f'Invalid time: {value!r}')
+        hour = hour % 12 + (12 if meridiem.lower() == 'pm' else 0)
+    if hour > 23 or minute > 59:
+        raise ValueError(f'Invalid time: {value!r}')
+    return time(hour, minute)
+
+
+def parse_time_range(value):
+    """Parse a legacy range such as '10 am - 11 am' into (start, end)"""
+    parts = re.split(r'\s*[-–]\s*', str(value).strip())
+    if len(parts) != 2:
+        raise ValueError(f'Invalid time range: {value!r}')
+    return parse_time(parts[0]), parse_time(parts[1])
+
+
+def _normalize(name):
+    name = ' '.join(str(name).split()).strip().lower()
+    return TITLE_PREFIX.sub('', name)
+
+
+def _name_map(pairs):
+    names = {}
+    for id_, name in pairs:
+        if not name:
+            continue
+        key = _normalize(name)
+        names[key] = AMBIGUOUS if names.get(key, id_) != id_ else id_
+    return names
+
+
+class Lookups:
+    """Name -> id maps for the reference tables, built once per import batch"""
+
+    def __init__(self):
+        rooms = db.session.execute(db.select(Room.id, Room.name)).all()
+        instructors = db.session.execute(db.select(Instructor.id, Instructor.name, Instructor.email)).all()
+        modules = db.session.execute(db.select(Module.id, Module.name)).all()
+        branches = db.session.execute(db.select(Branch.id, Branch.name, Branch.code)).all()
+
+        self.names = {
+            'room': _name_map((r.id, r.name) for r in rooms),
+            # Legacy files use initials, which match the instructor's email
+            'instructor': _name_map(
+                [(i.id, i.email.split('@')[0]) for i in instructors if i.email] +
+                [(i.id, i.name) for i in instructors]
+            ),
+            'module': _name_map((m.id, m.name) for m in modules),
+            'branch': _name_map(
+                [(b.id, b.name) for b in branches] + [(b.id, b.code) for b in branches]
+            )
+        }
+        self.ids = {
+            'room': {r.id for r in rooms},
+            'instructor': {i.id for i in instructors},
+            'module': {m.id for m in modules},
+            'branch': {b.id for b in branches}
+        }
+
+    def resolve(self, kind, row, default=None):
+        """Resolve <kind>_id or a <kind> name in row to a known id"""
+        raw_id = row.get(f'{kind}_id')
+        if raw_id not in (None, ''):
+            try:
+                id_ = int(raw_id)
+            except (TypeError, ValueError):
+                raise ValueError(f'Invalid {kind}_id: {raw_id!r}')
+            if id_ not in self.ids[kind]:
+                raise ValueError(f'Unknown {kind}_id: {id_}')
+            return id_
+
+        name = row.get(kind)
+        if name in (None, ''):
+            return default
+        id_ = self.names[kind].get(_normalize(name))
+        if id_ is None:
+            raise ValueError(f'Unknown {kind}: {name!r}')
+        if id_ == AMBIGUOUS:
+            raise ValueError(f'Ambiguous {kind}: {name!r}')
+        return id_
+
+
+def _build_class(row, lookups, branch_id, module_id):
+    """Turn one import row into Class column values, raising ValueError on bad input"""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+
+    subject = str(row.get('subject') or '').strip()
+    if not subject:
+        raise ValueError('Missing subject')
+
+    day = str(row.get('day') or '').strip().capitalize()
+    if day not in DAYS:
+        raise ValueError(f'Invalid day: {row.get("day")!r}')
+
+    if row.get('start_time') and row.get('end_time'):
+        start_time, end_time = parse_time(row['start_time']), parse_time(row['end_time'])
+    elif row.get('time'):
+        start_time, end_time = parse_time_range(row['time'])
+    else:
+        raise ValueError('Missing start_time/end_time or time')
+    if start_time >= end_time:
+        raise ValueError('Start time must be before end time')
+
+    values = {
+        'subject': subject,
+        'day': day,
+        'weekday': DAYS.index(day),
+        'start_time': start_time,
+        'end_time': end_time,
+        'room_id': lookups.resolve('room', row),
+        'instructor_id': lookups.resolve('instructor', row),
+        'module_id': lookups.resolve('module', row, module_id),
+        'branch_id': lookups.resolve('branch', row, branch_id)
+    }
+    if values['branch_id'] is None:
+        raise ValueError('Missing branch')
+    return values
+
+
+def import_classes(rows, branch_id=None, module_id=None, dry_run=False):
+    """Validate and insert classes in a single transaction.
+
+    Names are resolved through Lookups and clashes are checked in memory
+    against both the existing timetable and earlier rows of the batch.
+    Rows that fail are reported and skipped; the rest are written with one
+    executemany INSERT. branch_id and module_id are used for rows that
+    don't name their own, as in class_routine.json; an unknown default
+    raises ValueError before any row is read.
+
+    Returns {'inserted': n, 'valid': n, 'errors': [{'row': n, 'error': msg}, ...]}
+    with rows numbered from 1.
+    """
+    lookups = Lookups()
+    for kind, default in (('branch', branch_id), ('module', module_id)):
+        if default is not None and default not in lookups.ids[kind]:
+            raise ValueError(f'Unknown {kind}_id: {default}')
+    errors = []
+    candidates = []
+    for number, row in enumerate(rows, 1):
+        try:
+            candidates.append((number, _build_class(row, lookups, branch_id, module_id)))
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+
+    index = ClashIndex.from_database({values['day'] for _, values in candidates})
+    to_insert = []
+    for number, values in candidates:
+        slot = (values['day'], values['start_time'], values['end_time'],
+                values['room_id'], values['instructor_id'], values['branch_id'], values['module_id'])
+        conflicts = index.find(*slot)
+        if conflicts:
+            errors.append({'row': number, 'error': 'Class clashes with existing classes',
+                           'conflicts': conflicts})
+            continue
+        index.add({'row': number}, *slot)
+        to_insert.append(values)
+
+    if to_insert and not dry_run:
+        db.session.execute(db.insert(Class), to_insert)
+        db.session.commit()
+        cache.invalidate('classes')
+        grids.reset()
+        availability.reset()
+        changes.reset()
+
+    errors.sort(key=lambda e: e['row'])
+    return {
+        'inserted': 0 if dry_run else len(to_insert),
+        'valid': len(to_insert),
+        'errors': errors
+    }
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from flask import g, request, current_app, has_request_context, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+from serialization import FastJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint series: name -> (help text, prometheus type)
+SERIES = {
+    'requests_total': ('Requests handled', 'counter'),
+    'request_seconds_total': ('Wall time spent handling requests', 'counter'),
+    'db_queries_total': ('SQL statements executed', 'counter'),
+    'db_seconds_total': ('Time spent executing SQL', 'counter'),
+    'db_rows_total': ('ORM rows loaded plus rows changed by DML', 'counter'),
+    'serialize_seconds_total': ('Time spent encoding JSON', 'counter'),
+    'render_seconds_total': ('Time spent rendering templates', 'counter'),
+    'query_budget_exceeded_total': ('Requests that ran more queries than QUERY_BUDGET', 'counter'),
+    'rate_limited_total': ('Requests rejected with 429 by the rate limiter', 'counter')
+}
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else round(value, 6)
+
+
+def _current():
+    """Timings of the request being handled, or None outside a request"""
+    if has_request_context():
+        return g.setdefault('_metrics', {'queries': 0, 'db': 0.0, 'rows': 0,
+                                         'serialize': 0.0, 'render': 0.0})
+    return None
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """JSON provider that books encoding time to the current request"""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            current = _current()
+            if current is not None:
+                current['serialize'] += time.perf_counter() - start
+
+
+class Metrics:
+    """Per-endpoint query, DB, serialization and render accounting.
+
+    SQL is timed through engine cursor events, templates through Flask's
+    render signals and JSON through TimedJSONProvider. Totals are kept per
+    endpoint for /metrics; the current request's numbers can also be sent
+    back in a Server-Timing header.
+    """
+
+    def __init__(self):
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+        self._engine_hooked = False
+
+    def init_app(self, app):
+        app.config.setdefault('SERVER_TIMING', False)
+        app.config.setdefault('QUERY_BUDGET', None)
+        app.json_provider_class = TimedJSONProvider
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.extensions['metrics'] = self
+        self._hook_engine()
+
+    def _hook_engine(self):
+        if self._engine_hooked:
+            return
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(db.Model, 'load', self._instance_loaded, propagate=True)
+        self._engine_hooked = True
+
+    # -------- SQLAlchemy events --------
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['_query_start'].pop()
+        current = _current()
+        if current is not None:
+            current['queries'] += 1
+            current['db'] += elapsed
+            if cursor.rowcount and cursor.rowcount > 0:
+                current['rows'] += cursor.rowcount
+
+    @staticmethod
+    def _instance_loaded(target, context):
+        current = _current()
+        if current is not None:
+            current['rows'] += 1
+
+    # -------- Flask hooks --------
+
+    @staticmethod
+    def _before_request():
+        g._metrics_start = time.perf_counter()
+
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        g._render_start = time.perf_counter()
+
+    @staticmethod
+    def _after_render(sender, template, context, **extra):
+        current = _current()
+        start = g.pop('_render_start', None)
+        if current is not None and start is not None:
+            current['render'] += time.perf_counter() - start
+
+    def _after_request(self, response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        current = _current()
+        endpoint = request.endpoint or 'unmatched'
+
+        budget = current_app.config['QUERY_BUDGET']
+        over_budget = budget is not None and current['queries'] > budget
+        if over_budget:
+            logger.warning('%s ran %d queries (budget %d)', endpoint, current['queries'], budget)
+
+        with self._lock:
+            totals = self._totals[endpoint]
+            totals['requests_total'] += 1
+            totals['request_seconds_total'] += total
+            totals['db_queries_total'] += current['queries']
+            totals['db_seconds_total'] += current['db']
+            totals['db_rows_total'] += current['rows']
+            totals['serialize_seconds_total'] += current['serialize']
+            totals['render_seconds_total'] += current['render']
+            totals['query_budget_exceeded_total'] += over_budget
+            totals['rate_limited_total'] += response.status_code == 429
+
+        if current_app.config['SERVER_TIMING']:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={current["db"] * 1000:.2f};desc="{current["queries"]} queries"',
+                f'ser;dur={current["serialize"] * 1000:.2f}',
+                f'tpl;dur={current["render"] * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}'
+            ])
+        return response
+
+    # -------- Export --------
+
+    def snapshot(self):
+        """Copy of the per-endpoint totals"""
+        with self._lock:
+            return {endpoint: dict(totals) for endpoint, totals in self._totals.items()}
+
+    def prometheus(self, extra=None):
+        """Totals in the Prometheus text exposition format.
+
+        extra maps metric name -> (help, type, value) for unlabelled series.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, (help_text, kind) in SERIES.items():
+            lines.append(f'# HELP cit_{name} {help_text}')
+            lines.append(f'# TYPE cit_{name} {kind}')
+            for endpoint in sorted(snapshot):
+                value = snapshot[endpoint].get(name, 0)
+                lines.append(f'cit_{name}{{endpoint="{endpoint}"}} {_number(value)}')
+        for name, (help_text, kind, value) in (extra or {}).items():
+            lines.append(f'# HELP cit_{name} {help_text}')
+            lines.append(f'# TYPE cit_{name} {kind}')
+            lines.append(f'cit_{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -1,11 +1,96 @@
+import os
+from functools import lru_cache
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-class User(UserMixin, db.Model):
+# Weekdays in calendar order; Class.weekday stores the index into this list
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def weekday_default(context):
+    """Derive Class.weekday from the day name on Core inserts"""
+    return DAYS.index(context.get_current_parameters()['day'])
+
+
+def next_change_seq(connection):
+    """Change sequence number of the transaction on connection, taken on first use.
+
+    The counter row stays locked until the transaction ends, so numbers
+    become visible in the order they were handed out.
+    """
+    transaction = connection.get_transaction()
+    current = connection.info.get('change_seq')
+    if current is not None and current[0] is transaction:
+        return current[1]
+    state = SyncState.__table__
+    connection.execute(state.update().values(change_seq=state.c.change_seq + 1))
+    seq = connection.execute(db.select(state.c.change_seq)).scalar_one()
+    connection.info['change_seq'] = (transaction, seq)
+    return seq
+
+
+def change_seq_default(context):
+    """Stamp inserted and updated rows with their transaction's change sequence"""
+    return next_change_seq(context.connection)
+
+
+def committed_change_seq(connection):
+    """Change sequence taken by the transaction being committed on connection, if any"""
+    current = connection.info.get('change_seq')
+    if current is not None and current[0] is connection.get_transaction():
+        return current[1]
+    return None
+
+
+def data_version():
+    """(epoch, change sequence) of the database, moved by every committed write.
+
+    Shared by all worker processes, so each can tell when another one
+    changed the data it has cached.
+    """
+    state = SyncState.__table__
+    return tuple(db.session.execute(db.select(state.c.epoch, state.c.change_seq)).one())
+
+
+@lru_cache(maxsize=None)
+def _hash_prefix(method):
+    """The 'method' part werkzeug writes for a configured hash method"""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+class RoleMixin:
+    """Role checks shared by User and the cached session user"""
+    
+    def is_admin(self):
+        return self.role == 'admin'
+    
+    def is_teacher(self):
+        return self.role == 'teacher'
+    
+    def is_cr(self):
+        return self.role == 'cr'
+    
+    def is_student(self):
+        return self.role == 'student'
+
+
+class SyncMixin:
+    """Change tracking for the tables offline clients sync"""
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, index=True,
+                           default=change_seq_default, onupdate=change_seq_default)
+
+
+class User(RoleMixin, UserMixin, db.Model):
     """User model for authentication and authorization"""
     __tablename__ = 'users'
     
@@ -22,24 +107,22 @@ class User(UserMixin, db.Model):
     year = db.relationship('Year', back_populates='users')
     
     def set_password(self, password):
-        """Set hashed password"""
-        self.password_hash = generate_password_hash(password)
+        """Set hashed password using the configured method and salt length"""
+        self.password_hash = generate_password_hash(
+            password,
+            method=current_app.config['PASSWORD_HASH_METHOD'],
+            salt_length=current_app.config['PASSWORD_SALT_LENGTH']
+        )
     
     def check_password(self, password):
         """Check password against hash"""
         return check_password_hash(self.password_hash, password)
     
-    def is_admin(self):
-        return self.role == 'admin'
-    
-    def is_teacher(self):
-        return self.role == 'teacher'
-    
-    def is_cr(self):
-        return self.role == 'cr'
-    
-    def is_student(self):
-        return self.role == 'student'
+    def needs_rehash(self):
+        """Whether the stored hash was made with other parameters than configured now"""
+        method, salt, _ = self.password_hash.split('$', 2)
+        return (method != _hash_prefix(current_app.config['PASSWORD_HASH_METHOD']) or
+                len(salt) != current_app.config['PASSWORD_SALT_LENGTH'])
     
     def can_edit_class(self, class_obj):
         """Check if user can edit a specific class"""
@@ -55,7 +138,7 @@ class User(UserMixin, db.Model):
         return f'<User {self.username} ({self.role})>'
 
 
-class Branch(db.Model):
+class Branch(SyncMixin, db.Model):
     """Branch/Department model"""
     __tablename__ = 'branches'
     
@@ -73,7 +156,7 @@ class Branch(db.Model):
         return f'<Branch {self.name} ({self.code})>'
 
 
-class Year(db.Model):
+class Year(SyncMixin, db.Model):
     """Academic Year model"""
     __tablename__ = 'years'
     
@@ -89,7 +172,7 @@ class Year(db.Model):
         return f'<Year {self.name}>'
 
 
-class Module(db.Model):
+class Module(SyncMixin, db.Model):
     """Module/Semester model"""
     __tablename__ = 'modules'
     
@@ -106,7 +189,7 @@ class Module(db.Model):
         return f'<Module {self.name}>'
 
 
-class Instructor(db.Model):
+class Instructor(SyncMixin, db.Model):
     """Instructor/Teacher model"""
     __tablename__ = 'instructors'
     
@@ -125,7 +208,7 @@ class Instructor(db.Model):
         return f'<Instructor {self.name}>'
 
 
-class Room(db.Model):
+class Room(SyncMixin, db.Model):
     """Room/Classroom model"""
     __tablename__ = 'rooms'
     
@@ -142,15 +225,26 @@ class Room(db.Model):
         return f'<Room {self.name} ({self.building})>'
 
 
-class Class(db.Model):
+class Class(SyncMixin, db.Model):
     """Class/Routine model"""
     __tablename__ = 'classes'
+    __table_args__ = (
+        # Listing order in calendar order, also the keyset for paginated reads
+        db.Index('ix_classes_weekday_start', 'weekday', 'start_time'),
+        # Per-branch weekly grid
+        db.Index('ix_classes_branch_weekday_start', 'branch_id', 'weekday', 'start_time'),
+        # Clash detection scans one resource's bookings for a day by start time
+        db.Index('ix_classes_day_room_start', 'day', 'room_id', 'start_time'),
+        db.Index('ix_classes_day_instructor_start', 'day', 'instructor_id', 'start_time'),
+        db.Index('ix_classes_day_branch_module_start', 'day', 'branch_id', 'module_id', 'start_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     subject = db.Column(db.String(100), nullable=False)
     start_time = db.Column(db.Time, nullable=False)
     end_time = db.Column(db.Time, nullable=False)
-    day = db.Column(db.String(20), nullable=False, index=True)  # Monday, Tuesday, etc.
+    day = db.Column(db.String(20), nullable=False)  # Monday, Tuesday, etc.
+    weekday = db.Column(db.SmallInteger, nullable=False, default=weekday_default)  # 0 = Monday
     
     # Foreign Keys
     room_id = db.Column(db.Integer, db.ForeignKey('rooms.id'), nullable=True)
@@ -166,92 +260,207 @@ class Class(db.Model):
     module = db.relationship('Module', back_populates='classes')
     branch = db.relationship('Branch', back_populates='classes')
     
+    @validates('day')
+    def _sync_weekday(self, key, day):
+        """Keep weekday in step with the day name"""
+        if day not in DAYS:
+            raise ValueError(f'Invalid day: {day!r}')
+        self.weekday = DAYS.index(day)
+        return day
+    
     def __repr__(self):
         return f'<Class {self.subject} ({self.day} {self.start_time}-{self.end_time})>'
 
 
+class SyncState(db.Model):
+    """Single row holding the last change sequence number handed out"""
+    __tablename__ = 'sync_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # Changes when the database is recreated, so old sync tokens are refused
+    epoch = db.Column(db.String(16), nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Tombstone(db.Model):
+    """A deleted row of a synced table, so clients can drop their copy"""
+    __tablename__ = 'tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Tables whose changes /api/sync reports
+SYNC_MODELS = {model.__tablename__: model for model in (Branch, Year, Module, Instructor, Room, Class)}
+
+
+def _tombstone(mapper, connection, target):
+    """Record an ORM delete of a synced row"""
+    connection.execute(db.insert(Tombstone).values(
+        table_name=mapper.local_table.name, row_id=target.id,
+        change_seq=next_change_seq(connection), deleted_at=datetime.utcnow()))
+
+
+def _tombstone_bulk_delete(orm_execute_state):
+    """Record the rows a bulk DELETE on a synced table is about to remove"""
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return
+    table = orm_execute_state.bind_mapper.local_table
+    if table.name not in SYNC_MODELS:
+        return
+    statement = orm_execute_state.statement
+    connection = orm_execute_state.session.connection(bind_arguments={'clause': statement})
+    deleted = db.select(db.literal(table.name), table.c.id, db.literal(next_change_seq(connection)),
+                        db.literal(datetime.utcnow()))
+    if statement.whereclause is not None:
+        deleted = deleted.where(statement.whereclause)
+    connection.execute(db.insert(Tombstone).from_select(
+        ['table_name', 'row_id', 'change_seq', 'deleted_at'], deleted))
+
+
+def _bump_change_seq(mapper, connection, target):
+    """Users aren't synced, but their changes still move the data version"""
+    next_change_seq(connection)
+
+
+for _model in SYNC_MODELS.values():
+    event.listen(_model, 'after_delete', _tombstone)
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(User, _event, _bump_change_seq)
+event.listen(RoutingSession, 'do_orm_execute', _tombstone_bulk_delete)
+
+
+def migrate_db():
+    """Bring databases created by older versions up to the current schema"""
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns('classes')}
+    if 'weekday' not in columns:
+        # Unknown day names sort after Sunday
+        cases = ' '.join(f"WHEN '{day}' THEN {i}" for i, day in enumerate(DAYS))
+        db.session.execute(db.text('ALTER TABLE classes ADD COLUMN weekday SMALLINT NOT NULL DEFAULT 0'))
+        db.session.execute(db.text(f'UPDATE classes SET weekday = CASE day {cases} ELSE {len(DAYS)} END'))
+        db.session.execute(db.text('DROP INDEX IF EXISTS ix_classes_day_start'))
+        db.session.commit()
+    
+    if 'ix_classes_day' in {i['name'] for i in db.inspect(db.engine).get_indexes('classes')}:
+        # Lookups by day use the clash detection indexes, which start with it
+        db.session.execute(db.text('DROP INDEX ix_classes_day'))
+        db.session.commit()
+    
+    for table in SYNC_MODELS:
+        if 'change_seq' not in {c['name'] for c in db.inspect(db.engine).get_columns(table)}:
+            # Rows from before change tracking count as unchanged since sequence 0
+            db.session.execute(db.text(f'ALTER TABLE {table} ADD COLUMN updated_at DATETIME'))
+            db.session.execute(db.text(f'ALTER TABLE {table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0'))
+            db.session.execute(db.text(f'UPDATE {table} SET updated_at = created_at'))
+            db.session.commit()
+
+
+def create_schema():
+    """Create missing tables, columns and indexes"""
+    db.create_all()
+    migrate_db()
+    
+    # create_all() skips indexes added to tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    if SyncState.query.first() is None:
+        db.session.add(SyncState(epoch=os.urandom(4).hex()))
+        db.session.commit()
+
+
+def seed_db():
+    """Add default branches, years, rooms, admin and samples to an empty database"""
+    if Branch.query.first() is not None:
+        return False
+    
+    # Add default branches
+    branches = [
+        Branch(name='Computer Science', code='CS'),
+        Branch(name='Electronics & Communication', code='EC'),
+        Branch(name='Civil Engineering', code='CE'),
+        Branch(name='Mechanical Engineering', code='ME'),
+        Branch(name='Electrical Engineering', code='EE'),
+    ]
+    db.session.add_all(branches)
+    
+    # Add default years
+    years = [
+        Year(name='1st Year'),
+        Year(name='2nd Year'),
+        Year(name='3rd Year'),
+        Year(name='4th Year'),
+    ]
+    db.session.add_all(years)
+    
+    # Add default rooms
+    rooms = [
+        Room(name='101', building='Building A', capacity=60),
+        Room(name='102', building='Building A', capacity=60),
+        Room(name='103', building='Building A', capacity=40),
+        Room(name='201', building='Building B', capacity=60),
+        Room(name='202', building='Building B', capacity=60),
+        Room(name='228', building='Building B', capacity=50),
+        Room(name='Lab 1', building='Building C', capacity=30),
+        Room(name='Lab 2', building='Building C', capacity=30),
+    ]
+    db.session.add_all(rooms)
+    
+    # Add default admin user (password: admin123)
+    admin = User(
+        username='admin',
+        role='admin'
+    )
+    admin.set_password('admin123')
+    db.session.add(admin)
+    
+    # Add some sample instructors
+    instructors = [
+        Instructor(name='Dr. GCR', email='gcr@cit.ac.in', branch_id=1),
+        Instructor(name='Dr. PSB', email='psb@cit.ac.in', branch_id=1),
+        Instructor(name='Dr. RKS', email='rks@cit.ac.in', branch_id=2),
+        Instructor(name='Dr. SKM', email='skm@cit.ac.in', branch_id=3),
+    ]
+    db.session.add_all(instructors)
+    
+    # Add default modules
+    modules = [
+        Module(name='Semester 1', year_id=1),
+        Module(name='Semester 2', year_id=1),
+        Module(name='Semester 3', year_id=2),
+        Module(name='Semester 4', year_id=2),
+        Module(name='Semester 5', year_id=3),
+        Module(name='Semester 6', year_id=3),
+        Module(name='Semester 7', year_id=4),
+        Module(name='Semester 8', year_id=4),
+    ]
+    db.session.add_all(modules)
+    
+    # Add sample classes
+    from datetime import time
+    classes = [
+        Class(subject='ECONOMICS', start_time=time(10, 0), end_time=time(11, 0), 
+              day='Monday', room_id=6, instructor_id=1, module_id=1, branch_id=1),
+        Class(subject='SOFTWARE ENGINEERING', start_time=time(11, 0), end_time=time(12, 0), 
+              day='Monday', room_id=6, instructor_id=2, module_id=1, branch_id=1),
+        Class(subject='DATA STRUCTURES', start_time=time(10, 0), end_time=time(11, 0), 
+              day='Tuesday', room_id=7, instructor_id=2, module_id=1, branch_id=1),
+    ]
+    db.session.add_all(classes)
+    
+    db.session.commit()
+    return True
+
+
 def init_db(app):
-    """Initialize database with default values"""
+    """Create the schema and seed default data"""
     with app.app_context():
-        db.create_all()
-        
-        # Check if data already exists
-        if Branch.query.first() is None:
-            # Add default branches
-            branches = [
-                Branch(name='Computer Science', code='CS'),
-                Branch(name='Electronics & Communication', code='EC'),
-                Branch(name='Civil Engineering', code='CE'),
-                Branch(name='Mechanical Engineering', code='ME'),
-                Branch(name='Electrical Engineering', code='EE'),
-            ]
-            db.session.add_all(branches)
-            
-            # Add default years
-            years = [
-                Year(name='1st Year'),
-                Year(name='2nd Year'),
-                Year(name='3rd Year'),
-                Year(name='4th Year'),
-            ]
-            db.session.add_all(years)
-            
-            # Add default rooms
-            rooms = [
-                Room(name='101', building='Building A', capacity=60),
-                Room(name='102', building='Building A', capacity=60),
-                Room(name='103', building='Building A', capacity=40),
-                Room(name='201', building='Building B', capacity=60),
-                Room(name='202', building='Building B', capacity=60),
-                Room(name='228', building='Building B', capacity=50),
-                Room(name='Lab 1', building='Building C', capacity=30),
-                Room(name='Lab 2', building='Building C', capacity=30),
-            ]
-            db.session.add_all(rooms)
-            
-            # Add default admin user (password: admin123)
-            admin = User(
-                username='admin',
-                role='admin'
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            
-            # Add some sample instructors
-            instructors = [
-                Instructor(name='Dr. GCR', email='gcr@cit.ac.in', branch_id=1),
-                Instructor(name='Dr. PSB', email='psb@cit.ac.in', branch_id=1),
-                Instructor(name='Dr. RKS', email='rks@cit.ac.in', branch_id=2),
-                Instructor(name='Dr. SKM', email='skm@cit.ac.in', branch_id=3),
-            ]
-            db.session.add_all(instructors)
-            
-            # Add default modules
-            modules = [
-                Module(name='Semester 1', year_id=1),
-                Module(name='Semester 2', year_id=1),
-                Module(name='Semester 3', year_id=2),
-                Module(name='Semester 4', year_id=2),
-                Module(name='Semester 5', year_id=3),
-                Module(name='Semester 6', year_id=3),
-                Module(name='Semester 7', year_id=4),
-                Module(name='Semester 8', year_id=4),
-            ]
-            db.session.add_all(modules)
-            
-            # Add sample classes
-            from datetime import time
-            classes = [
-                Class(subject='ECONOMICS', start_time=time(10, 0), end_time=time(11, 0), 
-                      day='Monday', room_id=6, instructor_id=1, module_id=1, branch_id=1),
-                Class(subject='SOFTWARE ENGINEERING', start_time=time(11, 0), end_time=time(12, 0), 
-                      day='Monday', room_id=6, instructor_id=2, module_id=1, branch_id=1),
-                Class(subject='DATA STRUCTURES', start_time=time(10, 0), end_time=time(11, 0), 
-                      day='Tuesday', room_id=7, instructor_id=2, module_id=1, branch_id=1),
-            ]
-            db.session.add_all(classes)
-            
-            db.session.commit()
+        create_schema()
+        if seed_db():
             print("Database initialized with default data!")
         else:
             print("Database already initialized!")
@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import time
+from models import db
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(values):
+    """Opaque token holding the sort key of the last row on a page"""
+    values = [v.isoformat() if isinstance(v, time) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Inverse of encode_cursor(), typed by the key columns"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [time.fromisoformat(v) if isinstance(c.type, db.Time) else v
+                for v, c in zip(values, columns)]
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_fields(requested, field_map, default_fields=None):
+    """Turn a comma separated fields= value into a list of known field names"""
+    if not requested:
+        return list(default_fields or field_map)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in field_map]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return names
+
+
+def fetch_page(base, field_map, order_by, criteria=(), fields=None, cursor=None, limit=None,
+               default_fields=None):
+    """Fetch one keyset page of base projected onto the requested fields.
+
+    Only the selected columns are read, and only the tables they come from
+    are joined. Rows are ordered by order_by, which must be unique and
+    non-null; the next page starts strictly after the previous page's last
+    key, so each page costs an index seek rather than an OFFSET scan.
+
+    Returns {'items': [...], 'next_cursor': token or None}.
+    """
+    names = parse_fields(fields, field_map, default_fields)
+    limit = DEFAULT_LIMIT if limit is None else min(limit, MAX_LIMIT)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+
+    columns = [field_map[name][0].label(name) for name in names]
+    keys = [column.label(f'_key{i}') for i, column in enumerate(order_by)]
+    stmt = db.select(*columns, *keys).select_from(base)
+
+    joined = set()
+    for name in names:
+        join = field_map[name][1]
+        if join is not None and join[0] not in joined:
+            stmt = stmt.outerjoin(*join)
+            joined.add(join[0])
+
+    stmt = stmt.where(*criteria)
+    if cursor:
+        stmt = stmt.where(db.tuple_(*order_by) > db.tuple_(*decode_cursor(cursor, order_by)))
+    rows = db.session.execute(stmt.order_by(*order_by).limit(limit + 1)).all()
+
+    items = [
+        {name: value.strftime('%H:%M') if isinstance(value, time) else value
+         for name, value in zip(names, row)}
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1][len(names):]) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
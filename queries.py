@@ -0,0 +1,175 @@
+from sqlalchemy.orm import joinedload
+from models import db, User, Branch, Year, Module, Instructor, Room, Class
+from cache import cache
+
+
+# Sort key for class listings; also the keyset used for pagination
+CLASS_ORDER = (Class.weekday, Class.start_time, Class.id)
+
+
+def class_criteria(user, branch_id=None, year_id=None, day=None):
+    """WHERE clauses for the classes a user asked for and is allowed to see"""
+    criteria = []
+
+    # Role-based filtering
+    if user.is_student() or user.is_cr():
+        criteria.append(Class.branch_id == user.branch_id)
+        if user.year_id:
+            criteria.append(Class.module_id.in_(_year_modules(user.year_id)))
+
+    if branch_id:
+        criteria.append(Class.branch_id == int(branch_id))
+    if year_id:
+        criteria.append(Class.module_id.in_(_year_modules(int(year_id))))
+    if day:
+        criteria.append(Class.day == day)
+
+    return criteria
+
+
+def class_query(user, branch_id=None, year_id=None, day=None):
+    """Build the role-scoped class query with related rows loaded in one pass"""
+    return Class.query.options(
+        joinedload(Class.room),
+        joinedload(Class.instructor),
+        joinedload(Class.module),
+        joinedload(Class.branch)
+    ).filter(*class_criteria(user, branch_id, year_id, day)).order_by(*CLASS_ORDER)
+
+
+def _year_modules(year_id):
+    """Subquery of module ids belonging to a year"""
+    return db.select(Module.id).where(Module.year_id == year_id)
+
+
+def serialize_class(c):
+    """Serialize a class with its related names"""
+    return {
+        'id': c.id,
+        'subject': c.subject,
+        'start_time': c.start_time.strftime('%H:%M'),
+        'end_time': c.end_time.strftime('%H:%M'),
+        'day': c.day,
+        'room': c.room.name if c.room else None,
+        'instructor': c.instructor.name if c.instructor else None,
+        'module': c.module.name if c.module else None,
+        'branch': c.branch.name if c.branch else None
+    }
+
+
+def user_scope(user):
+    """Cache scope describing which classes a user is allowed to see"""
+    if user.is_student() or user.is_cr():
+        return ('branch', user.branch_id, user.year_id)
+    return ('all',)
+
+
+def list_classes(user, branch_id=None, year_id=None, day=None):
+    """Serialized classes for a user, served from the timetable cache"""
+    key = ('classes', user_scope(user), branch_id or None, year_id or None, day or None)
+    return cache.get_or_set(key, lambda: [
+        serialize_class(c) for c in class_query(user, branch_id, year_id, day).all()
+    ])
+
+
+def list_classes_compact(user, branch_id=None, year_id=None, day=None):
+    """Classes with rooms, instructors, modules and branches sent once by id.
+
+    Rows are read without joins; the names come from the cached dropdown
+    data, restricted to the entities the rows reference.
+    """
+    key = ('classes-compact', user_scope(user), branch_id or None, year_id or None, day or None)
+    return cache.get_or_set(key, lambda: _load_classes_compact(user, branch_id, year_id, day))
+
+
+def _load_classes_compact(user, branch_id, year_id, day):
+    rows = db.session.execute(
+        db.select(Class.id, Class.subject, Class.start_time, Class.end_time, Class.day,
+                  Class.room_id, Class.instructor_id, Class.module_id, Class.branch_id)
+        .where(*class_criteria(user, branch_id, year_id, day))
+        .order_by(*CLASS_ORDER)
+    ).all()
+
+    reference = dropdown_data()
+    names = {kind: {e['id']: e['name'] for e in reference[kind]}
+             for kind in ('rooms', 'instructors', 'modules', 'branches')}
+    used = {kind: {} for kind in names}
+    classes = []
+    for row in rows:
+        for kind, ref_id in (('rooms', row.room_id), ('instructors', row.instructor_id),
+                             ('modules', row.module_id), ('branches', row.branch_id)):
+            if ref_id is not None and ref_id in names[kind]:
+                used[kind][str(ref_id)] = names[kind][ref_id]
+        classes.append({
+            'id': row.id,
+            'subject': row.subject,
+            'start_time': row.start_time.strftime('%H:%M'),
+            'end_time': row.end_time.strftime('%H:%M'),
+            'day': row.day,
+            'room_id': row.room_id,
+            'instructor_id': row.instructor_id,
+            'module_id': row.module_id,
+            'branch_id': row.branch_id
+        })
+    return dict(used, classes=classes)
+
+
+def dropdown_data():
+    """Reference data for the filter and form dropdowns"""
+    return cache.get_or_set(('dropdown',), _load_dropdown_data)
+
+
+def _load_dropdown_data():
+    return {
+        'branches': [{'id': b.id, 'name': b.name, 'code': b.code} for b in Branch.query.all()],
+        'years': [{'id': y.id, 'name': y.name} for y in Year.query.all()],
+        'modules': [{'id': m.id, 'name': m.name, 'year_id': m.year_id} for m in Module.query.all()],
+        'instructors': [{'id': i.id, 'name': i.name} for i in Instructor.query.all()],
+        'rooms': [{'id': r.id, 'name': r.name, 'building': r.building} for r in Room.query.all()]
+    }
+
+
+# ==================== FIELD PROJECTIONS ====================
+# Selectable fields per list API: name -> (column, outer join needed or None)
+
+CLASS_FIELDS = {
+    'id': (Class.id, None),
+    'subject': (Class.subject, None),
+    'start_time': (Class.start_time, None),
+    'end_time': (Class.end_time, None),
+    'day': (Class.day, None),
+    'room_id': (Class.room_id, None),
+    'instructor_id': (Class.instructor_id, None),
+    'module_id': (Class.module_id, None),
+    'branch_id': (Class.branch_id, None),
+    'room': (Room.name, (Room, Class.room_id == Room.id)),
+    'instructor': (Instructor.name, (Instructor, Class.instructor_id == Instructor.id)),
+    'module': (Module.name, (Module, Class.module_id == Module.id)),
+    'branch': (Branch.name, (Branch, Class.branch_id == Branch.id))
+}
+
+USER_FIELDS = {
+    'id': (User.id, None),
+    'username': (User.username, None),
+    'role': (User.role, None),
+    'branch_id': (User.branch_id, None),
+    'branch_name': (Branch.name, (Branch, User.branch_id == Branch.id)),
+    'year_id': (User.year_id, None),
+    'year_name': (Year.name, (Year, User.year_id == Year.id))
+}
+
+INSTRUCTOR_FIELDS = {
+    'id': (Instructor.id, None),
+    'name': (Instructor.name, None),
+    'email': (Instructor.email, None),
+    'phone': (Instructor.phone, None),
+    'branch_id': (Instructor.branch_id, None),
+    'branch_name': (Branch.name, (Branch, Instructor.branch_id == Branch.id))
+}
+
+MODULE_FIELDS = {
+    'id': (Module.id, None),
+    'name': (Module.name, None),
+    'year_id': (Module.year_id, None),
+    'year_name': (Year.name, (Year, Module.year_id == Year.id))
+}
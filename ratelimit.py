@@ -0,0 +1,185 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import current_app, jsonify, request, session, Response
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(value):
+    """'10/minute' -> (tokens per second, burst)"""
+    count, _, period = value.partition('/')
+    if not count.isdigit() or int(count) < 1 or period not in PERIODS:
+        raise ValueError(f'Invalid rate limit: {value!r}')
+    return int(count) / PERIODS[period], int(count)
+
+
+class MemoryBackend:
+    """Token buckets kept in this process.
+
+    Limits are per worker process, which is enough for a single worker or
+    for tests. At most max_keys buckets are kept; the least recently used
+    is dropped first, which at worst gives an idle client a full bucket.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token; returns (allowed, seconds until one is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker and host.
+
+    Each check is one script call, timed by the Redis server clock. If
+    Redis can't be reached the request is let through, so an outage of
+    the limiter never takes the site down with it.
+    """
+
+    SCRIPT = """
+        local now = redis.call('TIME')
+        now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATELIMIT_STORAGE_URL needs the redis package')
+        self.prefix = prefix
+        self._errors = redis.RedisError
+        self._script = redis.Redis.from_url(url).register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst):
+        try:
+            allowed, tokens = self._script(keys=[self.prefix + key], args=[rate, burst])
+        except self._errors as e:
+            logger.warning('Rate limiter backend unavailable, letting request through: %s', e)
+            return True, 0.0
+        return bool(allowed), 0.0 if allowed else (1 - float(tokens)) / rate
+
+
+class RateLimiter:
+    """Per-client token buckets for groups of endpoints.
+
+    Every request is charged to a group: 'read' for GET/HEAD and 'write'
+    otherwise, unless the view was tagged with limit(). The bucket is
+    keyed by the logged-in user id from the session cookie, or by the
+    client address for anonymous requests, so the check runs before the
+    user is loaded or any query is made. Requests over the limit get 429
+    with Retry-After.
+
+    Login attempts are charged per username and client address ('login'),
+    so students sharing a campus NAT don't use up each other's attempts,
+    and to a looser bucket for the whole address ('login_address'). The
+    client address is only right behind a reverse proxy with
+    PROXY_FIX_X_FOR set.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.limits = {}
+        self._counts = defaultdict(lambda: {'allowed': 0, 'rejected': 0})
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMITS', {})
+        self.limits = {group: parse_limit(value) for group, value in app.config['RATELIMITS'].items()}
+        url = app.config.get('RATELIMIT_STORAGE_URL')
+        self.backend = RedisBackend(url) if url else MemoryBackend()
+        app.before_request(self._before_request)
+        app.extensions['rate_limiter'] = self
+
+    def limit(self, group, methods=None):
+        """Charge a view to group instead of 'read'/'write'; None exempts it.
+
+        With methods, only those methods use group.
+        """
+        def decorator(view):
+            view.rate_limit = (group, methods)
+            return view
+        return decorator
+
+    def _group(self):
+        view = current_app.view_functions.get(request.endpoint)
+        group, methods = getattr(view, 'rate_limit', (False, None))
+        if group is False or (methods and request.method not in methods):
+            return 'read' if request.method in ('GET', 'HEAD') else 'write'
+        return group
+
+    def _before_request(self):
+        if not current_app.config['RATELIMIT_ENABLED'] or request.endpoint in (None, 'static'):
+            return None
+        group = self._group()
+        address = f'ip:{request.remote_addr}'
+        if group == 'login':
+            username = (request.form.get('username') or '').strip().lower()[:64]
+            buckets = [('login_address', address), ('login', f'{address}:user:{username}')]
+        else:
+            user_id = session.get('_user_id')
+            buckets = [(group, f'user:{user_id}' if user_id else address)]
+
+        for name, client in buckets:
+            if name not in self.limits:
+                continue
+            allowed, retry_after = self.backend.take(f'{name}:{client}', *self.limits[name])
+            with self._lock:
+                self._counts[name]['allowed' if allowed else 'rejected'] += 1
+            if not allowed:
+                return self._too_many(retry_after)
+        return None
+
+    @staticmethod
+    def _too_many(retry_after):
+        retry_after = max(1, math.ceil(retry_after))
+        if request.path.startswith('/api/'):
+            response = jsonify({'error': 'Too many requests', 'retry_after': retry_after})
+        else:
+            response = Response(f'Too many requests, try again in {retry_after} seconds.\n', mimetype='text/plain')
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def stats(self):
+        """Allowed and rejected requests per group"""
+        with self._lock:
+            return {group: dict(counts) for group, counts in self._counts.items()}
+
+    def rejected(self):
+        with self._lock:
+            return sum(counts['rejected'] for counts in self._counts.values())
+
+
+limiter = RateLimiter()
@@ -1,18 +1,23 @@
 from types import SimpleNamespace
-from flask import Flask, render_template
+from flask import Blueprint, Flask, render_template
+from markupsafe import Markup
 
 # Create a minimal Flask app pointing to the existing templates directory
 test_app = Flask(__name__, template_folder='templates', static_folder='static')
 
-# add minimal endpoints so url_for('dashboard') and url_for('logout') work
-@test_app.route('/', endpoint='dashboard')
+# add minimal endpoints so url_for('main.dashboard') and url_for('main.logout') work
+bp = Blueprint('main', __name__)
+
+@bp.route('/', endpoint='dashboard')
 def _dashboard():
     return ''
 
-@test_app.route('/logout', endpoint='logout')
+@bp.route('/logout', endpoint='logout')
 def _logout():
     return ''
 
+test_app.register_blueprint(bp)
+
 mock_user = SimpleNamespace(
     username='test',
     role='admin',
@@ -24,7 +29,10 @@ mock_user = SimpleNamespace(
 
 with test_app.test_request_context('/'):
     try:
-        out = render_template('dashboard.html', current_user=mock_user, branches=[SimpleNamespace(id=1,name='Main Branch')], years=[], classes=[], current_branch_id='', current_year_id='', current_day='')
+        branches = [SimpleNamespace(id=1,name='Main Branch')]
+        filters_fragment = Markup(render_template('dashboard_filters.html', current_user=mock_user, branches=branches, years=[], current_branch_id='', current_year_id='', current_day=''))
+        classes_fragment = Markup(render_template('dashboard_classes.html', current_user=mock_user, classes=[]))
+        out = render_template('dashboard.html', current_user=mock_user, branches=branches, filters_fragment=filters_fragment, classes_fragment=classes_fragment)
         print('Template rendered successfully (truncated):')
         print(out[:400])
     except Exception as e:
@@ -0,0 +1,167 @@
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import UpdateBase, event
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of replica-routed requests to a replica.
+
+    Flushes and DML always go to the primary, and mark the session so the
+    commit that follows is reported to the router.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['wrote'] = True
+            elif self.info.get('replica'):
+                return self._db.engines[self.info['replica']]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Round-robin routing of read-only views to the replica binds.
+
+    Replicas are the SQLALCHEMY_BINDS whose key starts with 'replica'. A
+    view decorated with read_only runs against the next healthy replica;
+    if it fails with a database error, the replica is skipped for
+    REPLICA_RETRY_SECONDS and the view is run again on the primary.
+
+    For REPLICA_STICKY_SECONDS after a commit, both the client that wrote
+    (through its session cookie) and this process (whose timetable cache
+    was just invalidated) read from the primary, so neither sees data from
+    before its own write while replicas catch up.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.sticky_seconds = 5
+        self.retry_seconds = 30
+        self.primary_until = 0.0
+        self._down = {}  # key -> monotonic time to try it again
+        self._cycle = itertools.count()
+        self._lock = threading.Lock()
+        self._reads = {}
+        self._failovers = 0
+        event.listen(RoutingSession, 'after_commit', self._after_commit)
+        event.listen(RoutingSession, 'after_rollback', self._after_rollback)
+
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        app.config.setdefault('REPLICA_RETRY_SECONDS', self.retry_seconds)
+        self.keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                           if key.startswith('replica'))
+        self.sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        self.retry_seconds = app.config['REPLICA_RETRY_SECONDS']
+        # A new app starts with every replica healthy and fresh counters
+        with self._lock:
+            self.primary_until = 0.0
+            self._down = {}
+            self._reads = dict.fromkeys(['primary'] + self.keys, 0)
+            self._failovers = 0
+        app.after_request(self._remember_write)
+        app.extensions['replicas'] = self
+
+    # -------- Routing --------
+
+    def read_only(self, view):
+        """Run view against a replica when the request allows it"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self._pick() if request.method in ('GET', 'HEAD') else None
+            if key is None:
+                self._count('primary')
+                return view(*args, **kwargs)
+
+            db_session = current_app.extensions['sqlalchemy'].session
+            db_session.info['replica'] = key
+            try:
+                response = view(*args, **kwargs)
+                self._count(key)
+                return response
+            except DBAPIError:
+                logger.warning('Replica %s failed, retrying on the primary', key, exc_info=True)
+                db_session.rollback()
+                db_session.info.pop('replica', None)
+                self._mark_down(key)
+                self._count('primary')
+                return view(*args, **kwargs)
+        return wrapper
+
+    def _pick(self):
+        if not self.keys:
+            return None
+        if time.monotonic() < self.primary_until or session.get('primary_until', 0) > time.time():
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.keys)):
+                key = self.keys[next(self._cycle) % len(self.keys)]
+                if self._down.get(key, 0) <= now:
+                    self._down.pop(key, None)
+                    return key
+        return None
+
+    def _mark_down(self, key):
+        with self._lock:
+            self._down[key] = time.monotonic() + self.retry_seconds
+            self._failovers += 1
+
+    def _count(self, key):
+        with self._lock:
+            self._reads[key] = self._reads.get(key, 0) + 1
+
+    # -------- Read-your-writes --------
+
+    def _after_commit(self, db_session):
+        if db_session.info.pop('wrote', False):
+            self.primary_until = time.monotonic() + self.sticky_seconds
+            g._replica_wrote = True
+
+    @staticmethod
+    def _after_rollback(db_session):
+        db_session.info.pop('wrote', None)
+
+    def _remember_write(self, response):
+        if g.pop('_replica_wrote', False) and self.keys:
+            session['primary_until'] = time.time() + self.sticky_seconds
+        return response
+
+    def stats(self):
+        """Counters for monitoring"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'replicas': list(self.keys),
+                'down': {key: round(until - now, 1) for key, until in self._down.items() if until > now},
+                'reads': dict(self._reads),
+                'failovers': self._failovers
+            }
+
+
+def sync_sqlite_replicas(db):
+    """Copy the primary into every SQLite replica with SQLite's backup API"""
+    copied = []
+    for key in replicas.keys:
+        engine = db.engines[key]
+        if engine.dialect.name != 'sqlite' or db.engine.dialect.name != 'sqlite':
+            continue
+        source, target = db.engine.raw_connection(), engine.raw_connection()
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            source.close()
+            target.close()
+        copied.append(key)
+    return copied
+
+
+replicas = ReplicaRouter()
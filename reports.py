@@ -0,0 +1,126 @@
+import csv
+import io
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from models import db, Class, Instructor, Room, Branch
+from cache import cache
+
+INSTRUCTOR_REPORT_FIELDS = ['id', 'name', 'branch', 'classes', 'days', 'weekly_hours', 'gap_hours', 'longest_gap_minutes']
+ROOM_REPORT_FIELDS = ['id', 'name', 'building', 'capacity', 'classes', 'days', 'weekly_hours', 'occupancy_pct',
+                      'seat_hours', 'gap_hours', 'longest_gap_minutes']
+
+
+class minutes_of_day(FunctionElement):
+    """Minutes since midnight of a TIME column, compiled per dialect"""
+    type = db.Integer()
+    name = 'minutes_of_day'
+    inherit_cache = True
+
+
+@compiles(minutes_of_day)
+def _minutes_of_day(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return f'CAST(EXTRACT(HOUR FROM {value}) * 60 + EXTRACT(MINUTE FROM {value}) AS INTEGER)'
+
+
+@compiles(minutes_of_day, 'sqlite')
+def _minutes_of_day_sqlite(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return f"(CAST(strftime('%H', {value}) AS INTEGER) * 60 + CAST(strftime('%M', {value}) AS INTEGER))"
+
+
+@compiles(minutes_of_day, 'mysql')
+def _minutes_of_day_mysql(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return f'(HOUR({value}) * 60 + MINUTE({value}))'
+
+
+def _workload(resource):
+    """Per-resource totals over its classes: count, minutes, days and idle gaps.
+
+    The gap before a class is its start minus the end of the resource's
+    previous class that day (LAG over resource and weekday), so the whole
+    week is summarised in one grouped pass over the classes table.
+    """
+    start, end = minutes_of_day(Class.start_time), minutes_of_day(Class.end_time)
+    previous_end = db.func.lag(end).over(partition_by=(resource, Class.weekday), order_by=Class.start_time)
+    bookings = db.select(
+        resource.label('resource_id'),
+        Class.weekday,
+        (end - start).label('minutes'),
+        (start - previous_end).label('gap')
+    ).where(resource.is_not(None)).subquery()
+
+    gap = db.case((bookings.c.gap > 0, bookings.c.gap), else_=0)
+    return db.select(
+        bookings.c.resource_id,
+        db.func.count().label('classes'),
+        db.func.sum(bookings.c.minutes).label('minutes'),
+        db.func.count(db.distinct(bookings.c.weekday)).label('days'),
+        db.func.sum(gap).label('gap_minutes'),
+        db.func.max(gap).label('longest_gap')
+    ).group_by(bookings.c.resource_id).subquery()
+
+
+def _hours(minutes):
+    return round((minutes or 0) / 60, 2)
+
+
+def instructor_workload(branch_id=None):
+    """Weekly teaching load of every instructor, busiest first"""
+    return cache.get_or_set(('report', 'instructors', branch_id), lambda: _instructor_workload(branch_id))
+
+
+def _instructor_workload(branch_id):
+    load = _workload(Class.instructor_id)
+    stmt = (db.select(Instructor.id, Instructor.name, Branch.name.label('branch'), load)
+            .outerjoin(load, load.c.resource_id == Instructor.id)
+            .outerjoin(Branch, Branch.id == Instructor.branch_id)
+            .order_by(db.func.coalesce(load.c.minutes, 0).desc(), Instructor.name, Instructor.id))
+    if branch_id is not None:
+        stmt = stmt.where(Instructor.branch_id == branch_id)
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'branch': row.branch,
+        'classes': row.classes or 0,
+        'days': row.days or 0,
+        'weekly_hours': _hours(row.minutes),
+        'gap_hours': _hours(row.gap_minutes),
+        'longest_gap_minutes': row.longest_gap or 0
+    } for row in db.session.execute(stmt)]
+
+
+def room_utilization(teaching_days, teaching_hours):
+    """Weekly use of every room, as a share of a teaching_days x teaching_hours week"""
+    return cache.get_or_set(('report', 'rooms', teaching_days, teaching_hours),
+                            lambda: _room_utilization(teaching_days * teaching_hours * 60))
+
+
+def _room_utilization(available_minutes):
+    use = _workload(Class.room_id)
+    stmt = (db.select(Room.id, Room.name, Room.building, Room.capacity, use)
+            .outerjoin(use, use.c.resource_id == Room.id)
+            .order_by(db.func.coalesce(use.c.minutes, 0).desc(), Room.name, Room.id))
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'building': row.building,
+        'capacity': row.capacity or 0,
+        'classes': row.classes or 0,
+        'days': row.days or 0,
+        'weekly_hours': _hours(row.minutes),
+        'occupancy_pct': round(100 * (row.minutes or 0) / available_minutes, 1) if available_minutes else None,
+        'seat_hours': round((row.capacity or 0) * (row.minutes or 0) / 60, 1),
+        'gap_hours': _hours(row.gap_minutes),
+        'longest_gap_minutes': row.longest_gap or 0
+    } for row in db.session.execute(stmt)]
+
+
+def report_csv(rows, fields):
+    """A report as CSV text with a header row"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
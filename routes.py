@@ -0,0 +1,862 @@
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, flash, jsonify, Response, stream_with_context
+from flask_login import login_user, logout_user, login_required, current_user
+from models import db, DAYS, User, Branch, Year, Module, Instructor, Room, Class
+from queries import (class_query, class_criteria, list_classes, list_classes_compact, dropdown_data, serialize_class, user_scope, CLASS_ORDER,
+                     CLASS_FIELDS, USER_FIELDS, INSTRUCTOR_FIELDS, MODULE_FIELDS)
+from pagination import fetch_page
+from cache import cache, user_cache
+from auth import password_verifier, LoginBusy
+from etags import conditional_get
+from clashes import find_clashes
+from importer import parse_rows, import_classes, parse_time
+from export import ndjson_lines, csv_lines, ical_lines
+from grid import grids, grid_key, grid_entry
+from metrics import metrics
+from replicas import replicas
+from events import changes, scope_filter
+from scheduler import generate_timetable, parse_time_budget
+from availability import availability, booking
+from sync import changes_since
+from bulk import bulk_update, bulk_delete, copy_week
+from fragments import fragments
+from ratelimit import limiter
+from reports import instructor_workload, room_utilization, report_csv, INSTRUCTOR_REPORT_FIELDS, ROOM_REPORT_FIELDS
+
+bp = Blueprint('main', __name__)
+
+def wants_page():
+    """Whether a list API was asked for a page or a field projection"""
+    return any(arg in request.args for arg in ('limit', 'cursor', 'fields'))
+
+def page_response(base, field_map, order_by, criteria=(), default_fields=None):
+    """JSON response with one keyset page of a list API"""
+    try:
+        page = fetch_page(
+            base, field_map, order_by, criteria,
+            fields=request.args.get('fields'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', type=int),
+            default_fields=default_fields
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page)
+
+# ==================== AUTH ROUTES ====================
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('.dashboard'))
+    return redirect(url_for('.login'))
+
+@bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit('login', methods=('POST',))
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('.dashboard'))
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        
+        user = User.query.filter_by(username=username).first()
+        
+        try:
+            valid = user is not None and password_verifier.verify(user.password_hash, password)
+        except LoginBusy:
+            flash('Too many people are logging in right now. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503
+        
+        if valid:
+            # Upgrade hashes made with older parameters while we have the password
+            if user.needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+            login_user(user)
+            return redirect(url_for('.dashboard'))
+        else:
+            flash('Invalid username or password', 'danger')
+    
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+@limiter.limit('login', methods=('POST',))
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('.dashboard'))
+    
+    branches = Branch.query.all()
+    years = Year.query.all()
+    
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        role = request.form.get('role')
+        branch_id = request.form.get('branch_id')
+        year_id = request.form.get('year_id')
+        
+        # Check if username exists
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists', 'danger')
+            return redirect(url_for('.register'))
+        
+        # Create new user
+        user = User(
+            username=username,
+            role=role,
+            branch_id=int(branch_id) if branch_id else None,
+            year_id=int(year_id) if year_id else None
+        )
+        user.set_password(password)
+        
+        db.session.add(user)
+        db.session.commit()
+        cache.invalidate('users')
+        user_cache.invalidate(user.id)
+        
+        flash('Registration successful! Please login.', 'success')
+        return redirect(url_for('.login'))
+    
+    return render_template('register.html', branches=branches, years=years)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('.login'))
+
+# ==================== DASHBOARD ROUTES ====================
+
+@bp.route('/dashboard')
+@replicas.read_only
+@login_required
+def dashboard():
+    # Get filter parameters
+    branch_id = request.args.get('branch_id')
+    year_id = request.args.get('year_id')
+    day = request.args.get('day')
+    
+    # Taken first, so the page's live updates can't miss a change made while it renders
+    change_id = changes.last_event_id() if current_app.config['LIVE_UPDATES'] else None
+    
+    # Branch/year filters are only honoured for admins
+    is_admin = current_user.is_admin()
+    scope = (user_scope(current_user), (is_admin and branch_id) or None, (is_admin and year_id) or None, day or None)
+    
+    # The filter panel and class table are rendered once per role, scope and filters until the next write
+    filters_fragment = fragments.render('dashboard_filters.html', (is_admin, branch_id, year_id, day), lambda: {
+        'branches': dropdown_data()['branches'],
+        'years': dropdown_data()['years'],
+        'current_branch_id': branch_id,
+        'current_year_id': year_id,
+        'current_day': day
+    })
+    classes_fragment = fragments.render('dashboard_classes.html', scope + (current_user.is_student(),), lambda: {
+        'classes': list_classes(current_user, *scope[1:])
+    })
+    
+    return render_template('dashboard.html', 
+                         filters_fragment=filters_fragment,
+                         classes_fragment=classes_fragment,
+                         branches=dropdown_data()['branches'],
+                         change_id=change_id)
+
+# ==================== API ROUTES ====================
+
+@bp.route('/api/classes', methods=['GET'])
+@replicas.read_only
+@login_required
+@conditional_get('classes', 'rooms', 'instructors', 'modules', 'branches')
+def get_classes():
+    branch_id = request.args.get('branch_id')
+    year_id = request.args.get('year_id')
+    day = request.args.get('day')
+    
+    if wants_page():
+        return page_response(
+            Class, CLASS_FIELDS, CLASS_ORDER,
+            class_criteria(current_user, branch_id, year_id, day),
+            default_fields=['id', 'subject', 'start_time', 'end_time', 'day',
+                            'room', 'instructor', 'module', 'branch']
+        )
+    
+    # ?format=compact sends each room, instructor, module and branch name once
+    if request.args.get('format') == 'compact':
+        return jsonify(list_classes_compact(current_user, branch_id, year_id, day))
+    
+    return jsonify(list_classes(current_user, branch_id, year_id, day))
+
+@bp.route('/api/grid', methods=['GET'])
+@replicas.read_only
+@login_required
+@conditional_get('classes', 'rooms', 'instructors', 'modules', 'branches')
+def get_grid():
+    # Students and CRs always get their own branch and year
+    if current_user.is_student() or current_user.is_cr():
+        branch_id, year_id = current_user.branch_id, current_user.year_id
+    else:
+        branch_id = request.args.get('branch_id', type=int)
+        year_id = request.args.get('year_id', type=int)
+        if branch_id is None:
+            return jsonify({'error': 'branch_id is required'}), 400
+    
+    return jsonify(grids.get(branch_id, year_id))
+
+@bp.route('/api/classes/export', methods=['GET'])
+@limiter.limit('heavy')
+@replicas.read_only
+@login_required
+def export_classes():
+    fmt = request.args.get('format', 'ndjson')
+    query = class_query(
+        current_user,
+        request.args.get('branch_id'),
+        request.args.get('year_id'),
+        request.args.get('day')
+    )
+    
+    # Rows are streamed straight from the cursor, never held as a list
+    if fmt == 'ndjson':
+        body, mimetype, filename = ndjson_lines(query), 'application/x-ndjson', 'timetable.ndjson'
+    elif fmt == 'csv':
+        body, mimetype, filename = csv_lines(query), 'text/csv', 'timetable.csv'
+    elif fmt == 'ics':
+        calendar_name = f'CIT Routine - {current_user.username}'
+        body, mimetype, filename = ical_lines(query, calendar_name), 'text/calendar', 'timetable.ics'
+    else:
+        return jsonify({'error': 'Unknown export format'}), 400
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@bp.route('/api/changes', methods=['GET'])
+@login_required
+def class_changes():
+    # 204 tells EventSource clients to stop reconnecting
+    if not current_app.config['LIVE_UPDATES']:
+        return '', 204
+    
+    # Students and CRs only hear about their own branch and year
+    if current_user.is_student() or current_user.is_cr():
+        visible = scope_filter(current_user.branch_id, current_user.year_id)
+    else:
+        visible = scope_filter(request.args.get('branch_id', type=int), request.args.get('year_id', type=int))
+    
+    # Browsers resend the id of the last event they saw when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        stream_with_context(changes.stream(visible, last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/api/availability', methods=['GET'])
+@replicas.read_only
+@login_required
+def get_availability():
+    instructor_id = request.args.get('instructor_id', type=int)
+    room_id = request.args.get('room_id', type=int)
+    day = request.args.get('day')
+    if day is not None and day not in DAYS:
+        return jsonify({'error': 'Invalid day'}), 400
+
+    try:
+        if instructor_id is not None or room_id is not None:
+            # Free windows of one instructor or room, for a day or the whole week
+            day_start = parse_time(request.args.get('from', '08:00'))
+            day_end = parse_time(request.args.get('to', '18:00'))
+        else:
+            # Rooms free for a given slot
+            if not day or not request.args.get('start_time') or not request.args.get('end_time'):
+                return jsonify({'error': 'day, start_time and end_time are required'}), 400
+            day_start = parse_time(request.args['start_time'])
+            day_end = parse_time(request.args['end_time'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if day_start >= day_end:
+        return jsonify({'error': 'End time must be after start time'}), 400
+
+    if instructor_id is not None or room_id is not None:
+        kind, resource_id = ('instructor', instructor_id) if instructor_id is not None else ('room', room_id)
+        days = [day] if day else DAYS[:6]
+        windows = availability.free_windows(kind, resource_id, [DAYS.index(d) for d in days], day_start, day_end,
+                                            request.args.get('min_minutes', 0, type=int))
+        return jsonify({kind + '_id': resource_id,
+                        'free': {d: windows[DAYS.index(d)] for d in days}})
+
+    rooms = availability.free_rooms(DAYS.index(day), day_start, day_end,
+                                     request.args.get('capacity', 0, type=int))
+    return jsonify({'day': day, 'start_time': day_start.strftime('%H:%M'),
+                    'end_time': day_end.strftime('%H:%M'), 'rooms': rooms})
+
+@bp.route('/api/sync', methods=['GET'])
+@replicas.read_only
+@login_required
+def sync_changes():
+    # Clients send back the token of their previous sync to get only what changed
+    try:
+        return jsonify(changes_since(current_user, request.args.get('since')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/api/classes', methods=['POST'])
+@login_required
+def add_class():
+    if current_user.is_student():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.json
+    
+    # Role-based validation
+    branch_id = data.get('branch_id')
+    if current_user.is_cr() and branch_id != current_user.branch_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    try:
+        start_time = parse_time(data.get('start_time'))
+        end_time = parse_time(data.get('end_time'))
+    except ValueError:
+        return jsonify({'error': 'Invalid time format'}), 400
+    
+    if start_time >= end_time:
+        return jsonify({'error': 'Start time must be before end time'}), 400
+    if data.get('day') not in DAYS:
+        return jsonify({'error': 'Invalid day'}), 400
+    
+    conflicts = find_clashes(
+        data.get('day'), start_time, end_time,
+        room_id=data.get('room_id'),
+        instructor_id=data.get('instructor_id'),
+        branch_id=branch_id,
+        module_id=data.get('module_id')
+    )
+    if conflicts:
+        return jsonify({'error': 'Class clashes with existing classes', 'conflicts': conflicts}), 409
+    
+    new_class = Class(
+        subject=data.get('subject'),
+        start_time=start_time,
+        end_time=end_time,
+        day=data.get('day'),
+        room_id=data.get('room_id'),
+        instructor_id=data.get('instructor_id'),
+        module_id=data.get('module_id'),
+        branch_id=branch_id
+    )
+    
+    db.session.add(new_class)
+    db.session.commit()
+    cache.invalidate('classes')
+    grids.apply(after=(grid_key(new_class), grid_entry(new_class)))
+    availability.apply(after=booking(new_class))
+    changes.publish(after=(grid_key(new_class), serialize_class(new_class)))
+    
+    return jsonify({'message': 'Class added successfully!'}), 201
+
+@bp.route('/api/classes/<int:cls_id>', methods=['PUT'])
+@login_required
+def update_class(cls_id):
+    if current_user.is_student():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    class_obj = Class.query.get_or_404(cls_id)
+    
+    # Role-based validation
+    if current_user.is_cr() and class_obj.branch_id != current_user.branch_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    data = request.json
+    if 'day' in data and data['day'] not in DAYS:
+        return jsonify({'error': 'Invalid day'}), 400
+    
+    try:
+        start_time = parse_time(data['start_time']) if 'start_time' in data else class_obj.start_time
+        end_time = parse_time(data['end_time']) if 'end_time' in data else class_obj.end_time
+    except ValueError:
+        return jsonify({'error': 'Invalid time format'}), 400
+    if start_time >= end_time:
+        return jsonify({'error': 'Start time must be before end time'}), 400
+    
+    before = (grid_key(class_obj), grid_entry(class_obj))
+    before_class = serialize_class(class_obj)
+    before_booking = booking(class_obj)
+    
+    class_obj.subject = data.get('subject', class_obj.subject)
+    class_obj.day = data.get('day', class_obj.day)
+    class_obj.room_id = data.get('room_id', class_obj.room_id)
+    class_obj.instructor_id = data.get('instructor_id', class_obj.instructor_id)
+    class_obj.module_id = data.get('module_id', class_obj.module_id)
+    class_obj.branch_id = data.get('branch_id', class_obj.branch_id)
+    class_obj.start_time = start_time
+    class_obj.end_time = end_time
+    
+    conflicts = find_clashes(
+        class_obj.day, class_obj.start_time, class_obj.end_time,
+        room_id=class_obj.room_id,
+        instructor_id=class_obj.instructor_id,
+        branch_id=class_obj.branch_id,
+        module_id=class_obj.module_id,
+        exclude_id=class_obj.id
+    )
+    if conflicts:
+        db.session.rollback()
+        return jsonify({'error': 'Class clashes with existing classes', 'conflicts': conflicts}), 409
+    
+    db.session.commit()
+    cache.invalidate('classes')
+    after = (grid_key(class_obj), grid_entry(class_obj))
+    grids.apply(before, after)
+    availability.apply(before_booking, booking(class_obj))
+    changes.publish((before[0], before_class), (after[0], serialize_class(class_obj)))
+    
+    return jsonify({'message': 'Class updated successfully!'})
+
+@bp.route('/api/classes/<int:cls_id>', methods=['DELETE'])
+@login_required
+def delete_class(cls_id):
+    if current_user.is_student():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    class_obj = Class.query.get_or_404(cls_id)
+    
+    # Role-based validation
+    if current_user.is_cr() and class_obj.branch_id != current_user.branch_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    before = (grid_key(class_obj), grid_entry(class_obj))
+    before_booking = booking(class_obj)
+    db.session.delete(class_obj)
+    db.session.commit()
+    cache.invalidate('classes')
+    grids.apply(before=before)
+    availability.apply(before=before_booking)
+    changes.publish(before=before)
+    
+    return jsonify({'message': 'Class deleted successfully!'})
+
+@bp.route('/api/classes/import', methods=['POST'])
+@limiter.limit('heavy')
+@login_required
+def bulk_import_classes():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Format follows the content type; JSON bodies may be an array or JSON lines
+    formats = {'text/csv': 'csv', 'application/json': 'json', 'application/x-ndjson': 'jsonl',
+               'application/jsonl': 'jsonl'}
+    fmt = formats.get(request.mimetype)
+    
+    try:
+        rows = parse_rows(request.get_data(as_text=True), fmt)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    branch_id = request.args.get('branch_id', type=int)
+    module_id = request.args.get('module_id', type=int)
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    
+    try:
+        return jsonify(import_classes(rows, branch_id, module_id, dry_run))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def bulk_response(result, status=200):
+    """JSON response for a bulk operation that is applied whole or not at all"""
+    if result['errors']:
+        clashes_only = all('conflicts' in e for e in result['errors'])
+        return jsonify(dict(result, error='No changes were applied')), 409 if clashes_only else 400
+    return jsonify(result), status
+
+@bp.route('/api/classes/bulk-update', methods=['POST'])
+@limiter.limit('heavy')
+@login_required
+def bulk_update_classes():
+    if current_user.is_student():
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates') if isinstance(data, dict) else None
+    if isinstance(updates, list) and len(updates) > current_app.config['BULK_MAX_CLASSES']:
+        return jsonify({'error': f'At most {current_app.config["BULK_MAX_CLASSES"]} classes per request'}), 400
+
+    try:
+        result = bulk_update(current_user, updates, dry_run=request.args.get('dry_run') in ('1', 'true'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return bulk_response(result)
+
+@bp.route('/api/classes/bulk-delete', methods=['POST'])
+@limiter.limit('heavy')
+@login_required
+def bulk_delete_classes():
+    if current_user.is_student():
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if isinstance(ids, list) and len(ids) > current_app.config['BULK_MAX_CLASSES']:
+        return jsonify({'error': f'At most {current_app.config["BULK_MAX_CLASSES"]} classes per request'}), 400
+
+    try:
+        result = bulk_delete(current_user, ids, dry_run=request.args.get('dry_run') in ('1', 'true'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return bulk_response(result)
+
+@bp.route('/api/classes/copy-week', methods=['POST'])
+@limiter.limit('heavy')
+@login_required
+def copy_week_route():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        result = copy_week(
+            data.get('branch_id'), data.get('module_id'), data.get('target_module_id'),
+            day_shift=data.get('day_shift', 0),
+            time_shift=data.get('time_shift', 0),
+            replace=bool(data.get('replace')),
+            dry_run=request.args.get('dry_run') in ('1', 'true')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return bulk_response(result, 201 if result['inserted'] else 200)
+
+@bp.route('/api/timetable/generate', methods=['POST'])
+@limiter.limit('heavy')
+@login_required
+def generate_timetable_route():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    spec = request.get_json(silent=True)
+    if not isinstance(spec, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    commit = request.args.get('commit') in ('1', 'true')
+    
+    try:
+        # Searches hold a worker, so the request can only shorten the configured budget
+        budget = current_app.config['TIMETABLE_GENERATOR_BUDGET']
+        if spec.get('time_budget') is not None:
+            budget = min(budget, parse_time_budget(spec['time_budget']))
+        result = generate_timetable(spec, commit=commit, time_budget=budget,
+                                    seed=request.args.get('seed', 0, type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if commit and result['unplaced']:
+        return jsonify(dict(result, error='Not every session could be placed')), 409
+    return jsonify(result), 201 if result['inserted'] else 200
+
+# ==================== ADMIN API ROUTES ====================
+
+@bp.route('/api/branches', methods=['GET', 'POST'])
+@login_required
+@conditional_get('branches', admin_only=True)
+def manage_branches():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if request.method == 'GET':
+        branches = Branch.query.all()
+        return jsonify([{'id': b.id, 'name': b.name, 'code': b.code} for b in branches])
+    
+    data = request.json
+    new_branch = Branch(name=data['name'], code=data['code'])
+    db.session.add(new_branch)
+    db.session.commit()
+    cache.invalidate('branches')
+    return jsonify({'message': 'Branch added!'}), 201
+
+@bp.route('/api/years', methods=['GET', 'POST'])
+@login_required
+@conditional_get('years', admin_only=True)
+def manage_years():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if request.method == 'GET':
+        years = Year.query.all()
+        return jsonify([{'id': y.id, 'name': y.name} for y in years])
+    
+    data = request.json
+    new_year = Year(name=data['name'])
+    db.session.add(new_year)
+    db.session.commit()
+    cache.invalidate('years')
+    return jsonify({'message': 'Year added!'}), 201
+
+@bp.route('/api/modules', methods=['GET', 'POST'])
+@login_required
+@conditional_get('modules', 'years', admin_only=True)
+def manage_modules():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if request.method == 'GET':
+        if wants_page():
+            return page_response(Module, MODULE_FIELDS, (Module.id,))
+        modules = Module.query.all()
+        return jsonify([{
+            'id': m.id, 
+            'name': m.name, 
+            'year_id': m.year_id,
+            'year_name': m.year.name if m.year else None
+        } for m in modules])
+    
+    data = request.json
+    new_module = Module(name=data['name'], year_id=data['year_id'])
+    db.session.add(new_module)
+    db.session.commit()
+    cache.invalidate('modules')
+    return jsonify({'message': 'Module added!'}), 201
+
+@bp.route('/api/instructors', methods=['GET', 'POST'])
+@login_required
+@conditional_get('instructors', 'branches', admin_only=True)
+def manage_instructors():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if request.method == 'GET':
+        if wants_page():
+            return page_response(Instructor, INSTRUCTOR_FIELDS, (Instructor.id,))
+        instructors = Instructor.query.all()
+        return jsonify([{
+            'id': i.id, 
+            'name': i.name, 
+            'email': i.email,
+            'phone': i.phone,
+            'branch_id': i.branch_id,
+            'branch_name': i.branch.name if i.branch else None
+        } for i in instructors])
+    
+    data = request.json
+    new_instructor = Instructor(
+        name=data['name'],
+        email=data.get('email'),
+        phone=data.get('phone'),
+        branch_id=data.get('branch_id')
+    )
+    db.session.add(new_instructor)
+    db.session.commit()
+    cache.invalidate('instructors')
+    return jsonify({'message': 'Instructor added!'}), 201
+
+@bp.route('/api/rooms', methods=['GET', 'POST'])
+@login_required
+@conditional_get('rooms', admin_only=True)
+def manage_rooms():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if request.method == 'GET':
+        rooms = Room.query.all()
+        return jsonify([{
+            'id': r.id, 
+            'name': r.name, 
+            'building': r.building,
+            'capacity': r.capacity
+        } for r in rooms])
+    
+    data = request.json
+    new_room = Room(
+        name=data['name'],
+        building=data.get('building'),
+        capacity=data.get('capacity', 0)
+    )
+    db.session.add(new_room)
+    db.session.commit()
+    cache.invalidate('rooms')
+    return jsonify({'message': 'Room added!'}), 201
+
+@bp.route('/api/users', methods=['GET'])
+@login_required
+@conditional_get('users', 'branches', 'years', admin_only=True)
+def manage_users():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if wants_page():
+        return page_response(User, USER_FIELDS, (User.id,))
+    
+    users = User.query.all()
+    return jsonify([{
+        'id': u.id,
+        'username': u.username,
+        'role': u.role,
+        'branch_id': u.branch_id,
+        'branch_name': u.branch.name if u.branch else None,
+        'year_id': u.year_id,
+        'year_name': u.year.name if u.year else None
+    } for u in users])
+
+
+# Admin DELETE endpoints
+@bp.route('/api/branches/<int:branch_id>', methods=['DELETE'])
+@login_required
+def delete_branch(branch_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    branch = Branch.query.get_or_404(branch_id)
+    db.session.delete(branch)
+    db.session.commit()
+    cache.invalidate('branches', 'users', 'instructors', 'classes')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+    user_cache.clear()
+    return jsonify({'message': 'Branch deleted!'})
+
+
+@bp.route('/api/years/<int:year_id>', methods=['DELETE'])
+@login_required
+def delete_year(year_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    year = Year.query.get_or_404(year_id)
+    db.session.delete(year)
+    db.session.commit()
+    cache.invalidate('years', 'users', 'modules')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+    user_cache.clear()
+    return jsonify({'message': 'Year deleted!'})
+
+
+@bp.route('/api/modules/<int:module_id>', methods=['DELETE'])
+@login_required
+def delete_module(module_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    module = Module.query.get_or_404(module_id)
+    db.session.delete(module)
+    db.session.commit()
+    cache.invalidate('modules', 'classes')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+    return jsonify({'message': 'Module deleted!'})
+
+
+@bp.route('/api/instructors/<int:instructor_id>', methods=['DELETE'])
+@login_required
+def delete_instructor(instructor_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    instr = Instructor.query.get_or_404(instructor_id)
+    db.session.delete(instr)
+    db.session.commit()
+    cache.invalidate('instructors', 'classes')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+    return jsonify({'message': 'Instructor deleted!'})
+
+
+@bp.route('/api/rooms/<int:room_id>', methods=['DELETE'])
+@login_required
+def delete_room(room_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    room = Room.query.get_or_404(room_id)
+    db.session.delete(room)
+    db.session.commit()
+    cache.invalidate('rooms', 'classes')
+    grids.reset()
+    availability.reset()
+    changes.reset()
+    return jsonify({'message': 'Room deleted!'})
+
+
+@bp.route('/api/users/<int:user_id>', methods=['DELETE'])
+@login_required
+def delete_user(user_id):
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    if user_id == current_user.id:
+        return jsonify({'error': 'Cannot delete yourself'}), 400
+    user = User.query.get_or_404(user_id)
+    db.session.delete(user)
+    db.session.commit()
+    cache.invalidate('users')
+    user_cache.invalidate(user_id)
+    return jsonify({'message': 'User deleted!'})
+
+# ==================== DATA ROUTES FOR DROPDOWNS ====================
+
+@bp.route('/api/dropdown-data')
+@replicas.read_only
+@login_required
+@conditional_get('branches', 'years', 'modules', 'instructors', 'rooms')
+def get_dropdown_data():
+    return jsonify(dropdown_data())
+
+# ==================== REPORT ROUTES ====================
+
+def report_response(rows, fields, filename):
+    """A report as JSON, or as a CSV download with ?format=csv"""
+    if request.args.get('format') == 'csv':
+        return Response(report_csv(rows, fields), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    return jsonify(rows)
+
+@bp.route('/api/reports/instructors')
+@limiter.limit('heavy')
+@replicas.read_only
+@login_required
+@conditional_get('classes', 'instructors', 'branches', admin_only=True)
+def instructor_report():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    rows = instructor_workload(request.args.get('branch_id', type=int))
+    return report_response(rows, INSTRUCTOR_REPORT_FIELDS, 'instructor-workload.csv')
+
+@bp.route('/api/reports/rooms')
+@limiter.limit('heavy')
+@replicas.read_only
+@login_required
+@conditional_get('classes', 'rooms', admin_only=True)
+def room_report():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    rows = room_utilization(current_app.config['REPORT_TEACHING_DAYS'], current_app.config['REPORT_TEACHING_HOURS'])
+    return report_response(rows, ROOM_REPORT_FIELDS, 'room-utilization.csv')
+
+# ==================== MONITORING ROUTES ====================
+
+@bp.route('/api/cache-stats')
+@login_required
+def cache_stats():
+    if not current_user.is_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(dict(cache.stats(), users=user_cache.stats(), replicas=replicas.stats(),
+                        rate_limits=limiter.stats()))
+
+@bp.route('/metrics')
+@limiter.limit(None)
+def prometheus_metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    stats = cache.stats()
+    body = metrics.prometheus({
+        'cache_hits_total': ('Timetable cache hits', 'counter', stats['hits']),
+        'cache_misses_total': ('Timetable cache misses', 'counter', stats['misses']),
+        'cache_evictions_total': ('Timetable cache evictions', 'counter', stats['evictions']),
+        'cache_entries': ('Timetable cache entries', 'gauge', stats['entries']),
+        'rate_limit_rejections_total': ('Requests rejected by the rate limiter', 'counter', limiter.rejected())
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,465 @@
+import random
+import time as clock
+from datetime import time
+from models import db, DAYS, Branch, Module, Instructor, Room, Class
+from importer import parse_time
+from cache import cache
+from grid import grids
+from events import changes
+from availability import availability
+
+DEFAULT_DAYS = DAYS[:6]
+DEFAULT_SLOTS = [(time(h), time(h + 1)) for h in range(9, 17)]
+
+
+def _bits(mask):
+    """Indexes of the set bits of mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Requirement:
+    """hours weekly sessions of one subject for one (branch, module) group"""
+
+    def __init__(self, ref, group, instructor_id, hours, rooms, max_per_day):
+        self.ref = ref
+        self.group = group
+        self.instructor_id = instructor_id
+        self.hours = hours
+        self.rooms = rooms  # candidate room ids, smallest first
+        self.max_per_day = max_per_day
+
+
+class Scheduler:
+    """Weekly timetable search over bitset availability.
+
+    Every (day, slot) is one bit of an int, so whether a group, instructor
+    or room is free is a mask operation. Sessions are placed one at a time,
+    always for the requirement with the fewest free slots left (MRV), on the
+    least loaded day. When a requirement has no free slot the search repairs
+    instead of backtracking: it takes the slot whose occupants are cheapest
+    to evict, puts them back in the queue and marks the move tabu for a
+    while. The best assignment seen is returned when time_budget runs out.
+    """
+
+    def __init__(self, days, slots, rooms, seed=0):
+        self.days = len(days)
+        self.slots = len(slots)
+        self.full = (1 << (self.days * self.slots)) - 1
+        self.day_masks = [((1 << self.slots) - 1) << (d * self.slots) for d in range(self.days)]
+        self.capacity = dict(rooms)
+        self.rng = random.Random(seed)
+        self.requirements = []
+        self._fixed = {}  # resource -> mask booked outside the search
+        self._busy = {}  # resource -> mask of fixed and placed sessions
+        self._owner = {}  # (resource, bit) -> session index
+        self._sessions = []  # session index -> requirement index
+        self._placed = {}  # session index -> (bit, room_id)
+        self._day_counts = []  # requirement index -> sessions per day
+        self._group_load = {}  # group -> sessions per day
+
+    # -------- Setup --------
+
+    def block(self, resource, bit):
+        """Mark a (kind, id) resource as taken at bit by an existing class"""
+        self._fixed[resource] = self._fixed.get(resource, 0) | (1 << bit)
+        self._busy[resource] = self._busy.get(resource, 0) | (1 << bit)
+
+    def add_requirement(self, ref, group, instructor_id, hours, size=0, max_per_day=None):
+        """Ask for hours sessions; returns False if no room is big enough"""
+        rooms = sorted((r for r, cap in self.capacity.items() if (cap or 0) >= size),
+                       key=lambda r: (self.capacity[r] or 0, r))
+        if not rooms:
+            return False
+        index = len(self.requirements)
+        max_per_day = max_per_day or -(-hours // self.days)
+        self.requirements.append(Requirement(ref, group, instructor_id, hours, rooms, max_per_day))
+        self._day_counts.append([0] * self.days)
+        self._group_load.setdefault(group, [0] * self.days)
+        self._sessions += [index] * hours
+        return True
+
+    # -------- Masks --------
+
+    def _resources(self, req):
+        resources = [('group', req.group)]
+        if req.instructor_id is not None:
+            resources.append(('instructor', req.instructor_id))
+        return resources
+
+    def _allowed(self, r):
+        """Bits on days where requirement r may still get a session"""
+        mask = self.full
+        for d, count in enumerate(self._day_counts[r]):
+            if count >= self.requirements[r].max_per_day:
+                mask &= ~self.day_masks[d]
+        return mask
+
+    def _free(self, r):
+        """Bits where requirement r could be placed without evicting anything"""
+        req = self.requirements[r]
+        mask = self._allowed(r)
+        for resource in self._resources(req):
+            mask &= ~self._busy.get(resource, 0)
+        rooms_free = 0
+        for room in req.rooms:
+            rooms_free |= ~self._busy.get(('room', room), 0)
+            if rooms_free & mask == mask:
+                break
+        return mask & rooms_free
+
+    # -------- Moves --------
+
+    def _place(self, session, bit, room):
+        r = self._sessions[session]
+        req = self.requirements[r]
+        for resource in self._resources(req) + [('room', room)]:
+            self._busy[resource] = self._busy.get(resource, 0) | (1 << bit)
+            self._owner[(resource, bit)] = session
+        self._placed[session] = (bit, room)
+        day = bit // self.slots
+        self._day_counts[r][day] += 1
+        self._group_load[req.group][day] += 1
+
+    def _unplace(self, session):
+        bit, room = self._placed.pop(session)
+        r = self._sessions[session]
+        req = self.requirements[r]
+        for resource in self._resources(req) + [('room', room)]:
+            self._busy[resource] &= ~(1 << bit)
+            del self._owner[(resource, bit)]
+        day = bit // self.slots
+        self._day_counts[r][day] -= 1
+        self._group_load[req.group][day] -= 1
+
+    def _best_bit(self, r, mask):
+        """Free bit for requirement r on its least used, least loaded day"""
+        req = self.requirements[r]
+        load = self._group_load[req.group]
+        counts = self._day_counts[r]
+        return min(_bits(mask), key=lambda b: (counts[b // self.slots], load[b // self.slots],
+                                               b % self.slots, self.rng.random()))
+
+    def _free_room(self, r, bit):
+        for room in self.requirements[r].rooms:
+            if not self._busy.get(('room', room), 0) >> bit & 1:
+                return room
+        return None
+
+    def _eviction(self, r, bit, victim_cost):
+        """(cost, sessions to evict, room) to place requirement r at bit, or None if a fixed class is in the way"""
+        req = self.requirements[r]
+        victims = set()
+        for resource in self._resources(req):
+            if self._fixed.get(resource, 0) >> bit & 1:
+                return None
+            owner = self._owner.get((resource, bit))
+            if owner is not None:
+                victims.add(owner)
+
+        best = None
+        for room in req.rooms:
+            resource = ('room', room)
+            if self._fixed.get(resource, 0) >> bit & 1:
+                continue
+            owner = self._owner.get((resource, bit))
+            extra = victim_cost(owner) if owner is not None and owner not in victims else 0
+            if best is None or extra < best[0]:
+                best = (extra, owner if extra else None, room)
+                if not extra:
+                    break
+        if best is None:
+            return None
+        extra, owner, room = best
+        if owner is not None:
+            victims.add(owner)
+        return sum(victim_cost(v) for v in victims), victims, room
+
+    # -------- Search --------
+
+    def solve(self, time_budget=10.0, max_steps=None):
+        """Place every session; returns (placements, unplaced requirement counts, stats)"""
+        started = clock.perf_counter()
+        deadline = started + time_budget
+        max_steps = max_steps or 200 * len(self._sessions) + 1000
+        pending = {}  # requirement index -> unplaced session indexes
+        for session, r in enumerate(self._sessions):
+            pending.setdefault(r, []).append(session)
+
+        tabu = {}  # (requirement, bit) -> step until which it may not be retaken by eviction
+        best_placed, best_missing = dict(self._placed), len(self._sessions)
+        steps = evictions = stuck = 0
+
+        while pending and steps < max_steps and clock.perf_counter() < deadline:
+            steps += 1
+            # Most constrained requirement first
+            frees = {r: self._free(r) for r in pending}
+            r = min(pending, key=lambda r: (bin(frees[r]).count('1'), -len(pending[r]), r))
+            session = pending[r].pop()
+            if not pending[r]:
+                del pending[r]
+
+            free = frees[r]
+            if free:
+                bit = self._best_bit(r, free)
+                self._place(session, bit, self._free_room(r, bit))
+            else:
+                # Repair: evict the cheapest set of sessions from an allowed slot.
+                # Sessions that have a free slot elsewhere are cheap to move.
+                costs = {}
+
+                def victim_cost(victim):
+                    if victim not in costs:
+                        costs[victim] = 0.25 if self._free(self._sessions[victim]) else 1.0
+                    return costs[victim]
+
+                choice = None
+                for bit in _bits(self._allowed(r)):
+                    eviction = self._eviction(r, bit, victim_cost)
+                    if eviction is None:
+                        continue
+                    cost = eviction[0] + self.rng.random() * 0.1
+                    if tabu.get((r, bit), 0) > steps:
+                        cost += len(self._sessions)
+                    if choice is None or cost < choice[0]:
+                        choice = (cost, bit, eviction[1], eviction[2])
+                if choice is None:
+                    # Every allowed slot is blocked by existing classes
+                    stuck += 1
+                    continue
+                _, bit, victims, room = choice
+                for victim in victims:
+                    vr = self._sessions[victim]
+                    tabu[(vr, self._placed[victim][0])] = steps + 10 + self.rng.randrange(10)
+                    self._unplace(victim)
+                    pending.setdefault(vr, []).append(victim)
+                    evictions += 1
+                self._place(session, bit, room)
+
+            missing = stuck + sum(len(s) for s in pending.values())
+            if missing < best_missing:
+                best_missing, best_placed = missing, dict(self._placed)
+
+        placements = []
+        for session, (bit, room) in sorted(best_placed.items()):
+            req = self.requirements[self._sessions[session]]
+            placements.append((req, bit // self.slots, bit % self.slots, room))
+        placed_per_req = {}
+        for req, _, _, _ in placements:
+            placed_per_req[id(req)] = placed_per_req.get(id(req), 0) + 1
+        unplaced = [(req, req.hours - placed_per_req.get(id(req), 0)) for req in self.requirements
+                    if placed_per_req.get(id(req), 0) < req.hours]
+        stats = {
+            'sessions': len(self._sessions),
+            'placed': len(placements),
+            'steps': steps,
+            'evictions': evictions,
+            'seconds': round(clock.perf_counter() - started, 3)
+        }
+        return placements, unplaced, stats
+
+
+# ==================== DATABASE ====================
+
+def _parse_days(spec):
+    days = spec.get('days')
+    if not days:
+        return list(DEFAULT_DAYS)
+    if not isinstance(days, list) or any(day not in DAYS for day in days):
+        raise ValueError('days must be a list of day names')
+    # A repeated day would be two bit columns for the same hours
+    if len(set(days)) != len(days):
+        raise ValueError('days must not repeat')
+    return days
+
+
+def _parse_slots(spec):
+    if not spec.get('slots'):
+        return list(DEFAULT_SLOTS)
+    if not isinstance(spec['slots'], list):
+        raise ValueError('slots must be a list of [start, end] pairs')
+    slots = []
+    for pair in spec['slots']:
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+            raise ValueError(f'Invalid slot: {pair!r}')
+        start, end = parse_time(pair[0]), parse_time(pair[1])
+        if start >= end:
+            raise ValueError(f'Slot {pair!r} must start before it ends')
+        slots.append((start, end))
+    slots.sort()
+    for (_, end), (start, _) in zip(slots, slots[1:]):
+        if start < end:
+            raise ValueError('Slots must not overlap')
+    return slots
+
+
+def _count(value, minimum):
+    """value as an int of at least minimum, or None"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    return value if value >= minimum else None
+
+
+def parse_time_budget(value):
+    """A search time budget in seconds from a request"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError('time_budget must be a number of seconds')
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValueError('time_budget must be a number of seconds')
+    if not 0 < value < float('inf'):
+        raise ValueError('time_budget must be a positive number of seconds')
+    return value
+
+
+def _parse_requirements(spec):
+    branches = set(db.session.execute(db.select(Branch.id)).scalars())
+    modules = set(db.session.execute(db.select(Module.id)).scalars())
+    instructors = dict(db.session.execute(db.select(Instructor.id, Instructor.branch_id)).all())
+    if not isinstance(spec.get('requirements') or [], list):
+        raise ValueError('requirements must be a list')
+    requirements = []
+    for number, item in enumerate(spec.get('requirements') or [], 1):
+        try:
+            subject = str(item['subject']).strip()
+            branch_id, module_id, hours = int(item['branch_id']), int(item['module_id']), int(item['hours'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Requirement {number} needs subject, branch_id, module_id and hours')
+        if not subject or hours < 1:
+            raise ValueError(f'Requirement {number} needs a subject and at least one hour')
+        if branch_id not in branches:
+            raise ValueError(f'Requirement {number}: unknown branch {branch_id}')
+        if module_id not in modules:
+            raise ValueError(f'Requirement {number}: unknown module {module_id}')
+        instructor_id = item.get('instructor_id')
+        if instructor_id is not None:
+            if _count(instructor_id, 1) not in instructors:
+                raise ValueError(f'Requirement {number}: unknown instructor {instructor_id!r}')
+            instructor_id = int(instructor_id)
+        size = _count(item.get('size') or 0, 0)
+        if size is None:
+            raise ValueError(f'Requirement {number}: size must be a whole number of seats')
+        max_per_day = item.get('max_per_day')
+        if max_per_day is not None:
+            max_per_day = _count(max_per_day, 1)
+            if max_per_day is None:
+                raise ValueError(f'Requirement {number}: max_per_day must be a positive integer')
+        requirements.append({
+            'subject': subject,
+            'branch_id': branch_id,
+            'module_id': module_id,
+            'hours': hours,
+            'instructor_id': instructor_id,
+            'size': size,
+            'max_per_day': max_per_day
+        })
+    if not requirements:
+        raise ValueError('No requirements given')
+    return requirements, instructors
+
+
+def _assign_instructors(requirements, instructors, slots_per_week):
+    """Give requirements without an instructor the least loaded one from their branch"""
+    load = {}
+    for req in requirements:
+        if req['instructor_id'] is not None:
+            load[req['instructor_id']] = load.get(req['instructor_id'], 0) + req['hours']
+    by_branch = {}
+    for instructor_id, branch_id in instructors.items():
+        by_branch.setdefault(branch_id, []).append(instructor_id)
+
+    for req in sorted(requirements, key=lambda r: -r['hours']):
+        if req['instructor_id'] is None and by_branch.get(req['branch_id']):
+            candidate = min(by_branch[req['branch_id']], key=lambda i: (load.get(i, 0), i))
+            if load.get(candidate, 0) + req['hours'] <= slots_per_week:
+                req['instructor_id'] = candidate
+                load[candidate] = load.get(candidate, 0) + req['hours']
+
+
+def generate_timetable(spec, commit=False, time_budget=10.0, seed=0):
+    """Build a clash-free week for spec['requirements'] and optionally save it.
+
+    spec may also give 'days' (names) and 'slots' ([start, end] pairs).
+    With 'replace' the classes of the requirements' (branch, module)
+    groups are dropped first; every other class stays as a fixed booking.
+    A timetable is only written when every session found a place.
+    """
+    days = _parse_days(spec)
+    slots = _parse_slots(spec)
+    requirements, instructors = _parse_requirements(spec)
+    _assign_instructors(requirements, instructors, len(days) * len(slots))
+    groups = {(r['branch_id'], r['module_id']) for r in requirements}
+    replace = bool(spec.get('replace'))
+
+    rooms = db.session.execute(db.select(Room.id, Room.capacity)).all()
+    scheduler = Scheduler(days, slots, rooms, seed=seed)
+
+    # Existing classes keep their rooms, instructors and groups busy
+    existing = db.session.execute(
+        db.select(Class.day, Class.start_time, Class.end_time, Class.room_id,
+                  Class.instructor_id, Class.branch_id, Class.module_id)
+        .where(Class.day.in_(days))
+    ).all()
+    for row in existing:
+        group = (row.branch_id, row.module_id)
+        if replace and group in groups:
+            continue
+        d = days.index(row.day)
+        for s, (start, end) in enumerate(slots):
+            if start < row.end_time and end > row.start_time:
+                bit = d * len(slots) + s
+                scheduler.block(('group', group), bit)
+                if row.room_id is not None:
+                    scheduler.block(('room', row.room_id), bit)
+                if row.instructor_id is not None:
+                    scheduler.block(('instructor', row.instructor_id), bit)
+
+    unplaced = []
+    for req in requirements:
+        if not scheduler.add_requirement(req, (req['branch_id'], req['module_id']), req['instructor_id'],
+                                         req['hours'], req['size'], req['max_per_day']):
+            unplaced.append(dict(req, missing=req['hours'], error='No room is big enough'))
+
+    placements, missing, stats = scheduler.solve(time_budget)
+    unplaced += [dict(req.ref, missing=count) for req, count in missing]
+
+    classes = []
+    for req, d, s, room_id in sorted(placements, key=lambda p: (p[1], p[2], p[0].ref['branch_id'])):
+        classes.append({
+            'subject': req.ref['subject'],
+            'day': days[d],
+            'weekday': DAYS.index(days[d]),
+            'start_time': slots[s][0],
+            'end_time': slots[s][1],
+            'room_id': room_id,
+            'instructor_id': req.instructor_id,
+            'module_id': req.ref['module_id'],
+            'branch_id': req.ref['branch_id']
+        })
+
+    inserted = 0
+    if commit and classes and not unplaced:
+        if replace:
+            for branch_id, module_id in groups:
+                db.session.execute(db.delete(Class).where(Class.branch_id == branch_id,
+                                                          Class.module_id == module_id))
+        db.session.execute(db.insert(Class), classes)
+        db.session.commit()
+        cache.invalidate('classes')
+        grids.reset()
+        availability.reset()
+        changes.reset()
+        inserted = len(classes)
+
+    for values in classes:
+        values['start_time'] = values['start_time'].strftime('%H:%M')
+        values['end_time'] = values['end_time'].strftime('%H:%M')
+        del values['weekday']
+    return {'classes': classes, 'unplaced': unplaced, 'inserted': inserted, 'stats': stats}
@@ -0,0 +1,26 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider tuned for large API payloads.
+
+    Keys are left in insertion order instead of being sorted and text is
+    sent as UTF-8 rather than \\u escapes. Compact output is encoded with
+    orjson when it is installed; dates still go through Flask's default()
+    so they look the same either way.
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs.get('separators') == (',', ':') and len(kwargs) == 1:
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+        return super().dumps(obj, **kwargs)
@@ -0,0 +1,89 @@
+from datetime import time
+from models import db, SyncState, Tombstone, SYNC_MODELS, Class
+from queries import class_criteria
+
+# Columns sent for each synced table
+SYNC_FIELDS = {
+    'branches': ('id', 'name', 'code'),
+    'years': ('id', 'name'),
+    'modules': ('id', 'name', 'year_id'),
+    'instructors': ('id', 'name', 'email', 'phone', 'branch_id'),
+    'rooms': ('id', 'name', 'building', 'capacity'),
+    'classes': ('id', 'subject', 'start_time', 'end_time', 'day',
+                'room_id', 'instructor_id', 'module_id', 'branch_id'),
+}
+
+
+def encode_token(epoch, seq):
+    return f'{epoch}-{seq}'
+
+
+def decode_token(token):
+    """(epoch, change sequence) of a sync token"""
+    epoch, _, seq = token.partition('-')
+    if not epoch or not seq.isdigit():
+        raise ValueError('Invalid sync token')
+    return epoch, int(seq)
+
+
+def _serialize(row, fields):
+    item = {}
+    for name in fields:
+        value = getattr(row, name)
+        item[name] = value.strftime('%H:%M') if isinstance(value, time) else value
+    item['updated_at'] = row.updated_at.isoformat() if row.updated_at else None
+    return item
+
+
+def changes_since(user, token=None):
+    """Rows of the synced tables changed after token, and the ids deleted since.
+
+    Without a token, or with one from another database, every row is sent
+    ('full': True). Otherwise only rows and tombstones whose change
+    sequence lies between the token and the current sequence are read,
+    through the change_seq indexes. Classes are limited to what the user
+    may see; classes that changed outside that scope are listed as
+    deleted, since they may have moved out of it.
+    """
+    state = db.session.execute(db.select(SyncState.epoch, SyncState.change_seq)).one()
+    since = None
+    if token:
+        epoch, seq = decode_token(token)
+        if epoch == state.epoch:
+            since = seq
+
+    result = {'token': encode_token(state.epoch, state.change_seq), 'full': since is None,
+              'changes': {table: [] for table in SYNC_MODELS},
+              'deleted': {table: [] for table in SYNC_MODELS}}
+    if since is not None and since >= state.change_seq:
+        # Nothing new, or a replica that has not caught up with this client yet
+        result['token'] = encode_token(state.epoch, since)
+        return result
+
+    # Rows committed after the sequence was read are left for the next sync
+    window = [] if since is None else [since]
+    for table, model in SYNC_MODELS.items():
+        criteria = [model.change_seq <= state.change_seq]
+        if window:
+            criteria.append(model.change_seq > since)
+        columns = [getattr(model, name) for name in SYNC_FIELDS[table]] + [model.updated_at]
+        scope = class_criteria(user) if model is Class else []
+        rows = db.session.execute(db.select(*columns).where(*criteria, *scope).order_by(model.id))
+        result['changes'][table] = [_serialize(row, SYNC_FIELDS[table]) for row in rows]
+        if window and scope:
+            result['deleted'][table] = list(db.session.execute(
+                db.select(model.id).where(*criteria, ~db.and_(*scope)).order_by(model.id)).scalars())
+
+    if window:
+        tombstones = db.session.execute(
+            db.select(Tombstone.table_name, Tombstone.row_id)
+            .where(Tombstone.change_seq > since, Tombstone.change_seq <= state.change_seq)
+            .order_by(Tombstone.change_seq))
+        for table_name, row_id in tombstones:
+            if table_name in result['deleted']:
+                result['deleted'][table_name].append(row_id)
+        # A deleted id that was reused by a newer row is not a deletion
+        for table, ids in result['deleted'].items():
+            live = {item['id'] for item in result['changes'][table]}
+            result['deleted'][table] = sorted(set(ids) - live)
+    return result
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import create_app
+from models import db, create_schema, seed_db, User
+from cache import cache, user_cache
+from grid import grids
+from availability import availability
+
+ADMIN = ('admin', 'admin123')
+
+
+class QueryCounter:
+    """Counts SQL statements sent to any engine while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def app():
+    """A fresh in-memory database with the default seed data"""
+    app = create_app('testing')
+    # Tests that need the data version re-read lower this
+    app.config['CACHE_VERSION_CHECK_SECONDS'] = 60
+    with app.app_context():
+        create_schema()
+        seed_db()
+        # The caches and indexes are process-wide; start every test cold
+        cache.check_version(force=True)
+    cache.invalidate()
+    user_cache.clear()
+    grids.reset()
+    availability.reset()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username, password):
+    return client.post('/login', data={'username': username, 'password': password})
+
+
+@pytest.fixture
+def physics():
+    """A class payload that is free of the seeded timetable"""
+    return {'subject': 'PHYSICS', 'day': 'Friday', 'start_time': '09:00', 'end_time': '10:00',
+            'room_id': 1, 'instructor_id': 3, 'module_id': 1, 'branch_id': 1}
+
+
+@pytest.fixture
+def admin(client):
+    """A test client logged in as the seeded admin"""
+    login(client, *ADMIN)
+    return client
+
+
+@pytest.fixture
+def student(app, client):
+    """A test client logged in as a first-year Electronics student"""
+    with app.app_context():
+        user = User(username='student', role='student', branch_id=2, year_id=1)
+        user.set_password('student123')
+        db.session.add(user)
+        db.session.commit()
+    login(client, 'student', 'student123')
+    return client
@@ -0,0 +1,80 @@
+import threading
+import pytest
+import auth
+import routes
+from auth import PasswordVerifier
+from models import db, User
+from tests.conftest import ADMIN, login
+
+
+def _stored_hash(app):
+    with app.app_context():
+        return db.session.execute(db.select(User.password_hash).where(User.username == ADMIN[0])).scalar_one()
+
+
+@pytest.mark.parametrize('setting, value, prefix', [
+    ('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000', 'pbkdf2:sha256:1000$'),
+    ('PASSWORD_SALT_LENGTH', 8, 'scrypt:'),
+])
+def test_login_upgrades_outdated_hashes(app, client, setting, value, prefix):
+    old = _stored_hash(app)
+    app.config[setting] = value
+
+    assert login(client, ADMIN[0], 'wrong').status_code == 200
+    assert _stored_hash(app) == old
+
+    assert login(client, *ADMIN).status_code == 302
+    new = _stored_hash(app)
+    assert new != old and new.startswith(prefix)
+    with app.app_context():
+        assert not db.session.execute(db.select(User).where(User.username == ADMIN[0])).scalar_one().needs_rehash()
+
+    # The upgraded hash still takes the same password
+    client.get('/logout')
+    assert login(client, *ADMIN).status_code == 302
+    assert _stored_hash(app) == new
+
+
+def test_current_hashes_are_left_alone(app, client):
+    old = _stored_hash(app)
+    assert login(client, *ADMIN).status_code == 302
+    assert _stored_hash(app) == old
+
+
+@pytest.fixture
+def busy_verifier(app, monkeypatch):
+    """A one-worker verifier whose worker is stuck on another login"""
+    app.config.update(LOGIN_HASH_WORKERS=1, LOGIN_HASH_QUEUE=0)
+    verifier = PasswordVerifier()
+    verifier.init_app(app)
+    monkeypatch.setattr(routes, 'password_verifier', verifier)
+
+    started, release = threading.Event(), threading.Event()
+    check = auth.check_password_hash
+
+    def slow_check(*args):
+        started.set()
+        release.wait(5)
+        return check(*args)
+
+    monkeypatch.setattr(auth, 'check_password_hash', slow_check)
+    stuck = threading.Thread(target=verifier.verify, args=(_stored_hash(app), ADMIN[1]))
+    stuck.start()
+    assert started.wait(5)
+    yield verifier
+    release.set()
+    stuck.join()
+
+
+def test_login_answers_503_when_hash_workers_are_busy(client, busy_verifier):
+    response = login(client, *ADMIN)
+    assert response.status_code == 503
+    assert b'Too many people are logging in' in response.data
+
+
+def test_login_through_the_worker_pool(app):
+    app.config.update(LOGIN_HASH_WORKERS=1, LOGIN_HASH_QUEUE=4)
+    verifier = PasswordVerifier()
+    verifier.init_app(app)
+    assert verifier.verify(_stored_hash(app), ADMIN[1])
+    assert not verifier.verify(_stored_hash(app), 'wrong')
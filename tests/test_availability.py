@@ -0,0 +1,69 @@
+import pytest
+
+
+def _free_rooms(client, day, start_time, end_time, **args):
+    response = client.get('/api/availability', query_string=dict(day=day, start_time=start_time,
+                                                                   end_time=end_time, **args))
+    assert response.status_code == 200
+    return {room['id'] for room in response.get_json()['rooms']}
+
+
+def test_free_rooms_filter_by_capacity(admin):
+    # Room 6 (228, 50 seats) holds ECONOMICS on Monday at 10; rooms 3, 7 and 8 are smaller
+    assert _free_rooms(admin, 'Monday', '10:00', '11:00') == {1, 2, 3, 4, 5, 7, 8}
+    assert _free_rooms(admin, 'Monday', '10:00', '11:00', capacity=50) == {1, 2, 4, 5}
+    assert _free_rooms(admin, 'Monday', '10:00', '11:00', capacity=61) == set()
+
+
+@pytest.mark.parametrize('start_time, end_time, free', [
+    ('09:00', '10:00', True),  # ends as ECONOMICS starts
+    ('12:00', '13:00', True),  # starts as SOFTWARE ENGINEERING ends
+    ('09:30', '10:01', False),
+    ('11:59', '12:30', False),
+    ('10:15', '10:45', False),
+    ('08:00', '13:00', False),
+])
+def test_free_rooms_back_to_back_edges(admin, start_time, end_time, free):
+    assert (6 in _free_rooms(admin, 'Monday', start_time, end_time)) is free
+
+
+def test_free_windows_of_a_room(admin):
+    response = admin.get('/api/availability?room_id=6&day=Monday')
+    assert response.get_json() == {'room_id': 6, 'free': {'Monday': [
+        {'start_time': '08:00', 'end_time': '10:00'}, {'start_time': '12:00', 'end_time': '18:00'}]}}
+
+    response = admin.get('/api/availability?room_id=6&day=Monday&min_minutes=150')
+    assert response.get_json()['free']['Monday'] == [{'start_time': '12:00', 'end_time': '18:00'}]
+
+
+def test_free_windows_of_an_instructor_over_the_week(admin):
+    free = admin.get('/api/availability?instructor_id=2&from=09:00&to=17:00').get_json()['free']
+    assert list(free) == ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+    assert free['Monday'] == [{'start_time': '09:00', 'end_time': '11:00'}, {'start_time': '12:00', 'end_time': '17:00'}]
+    assert free['Tuesday'] == [{'start_time': '09:00', 'end_time': '10:00'}, {'start_time': '11:00', 'end_time': '17:00'}]
+    assert free['Wednesday'] == [{'start_time': '09:00', 'end_time': '17:00'}]
+
+
+@pytest.mark.parametrize('query', [
+    'day=Funday&start_time=09:00&end_time=10:00', 'day=Monday&start_time=09:00',
+    'day=Monday&start_time=10:00&end_time=09:00', 'room_id=1&from=nine',
+])
+def test_availability_rejects_invalid_queries(admin, query):
+    assert admin.get('/api/availability?' + query).status_code == 400
+
+
+def test_index_follows_class_writes(admin, physics):
+    assert 1 in _free_rooms(admin, 'Friday', '09:00', '10:00')
+
+    assert admin.post('/api/classes', json=physics).status_code == 201
+    class_id = max(c['id'] for c in admin.get('/api/classes').get_json())
+    assert 1 not in _free_rooms(admin, 'Friday', '09:00', '10:00')
+    assert admin.get('/api/availability?instructor_id=3&day=Friday&from=08:00&to=12:00').get_json()['free'] == {
+        'Friday': [{'start_time': '08:00', 'end_time': '09:00'}, {'start_time': '10:00', 'end_time': '12:00'}]}
+
+    assert admin.put(f'/api/classes/{class_id}', json={'day': 'Thursday', 'room_id': 2}).status_code == 200
+    assert 1 in _free_rooms(admin, 'Friday', '09:00', '10:00')
+    assert 2 not in _free_rooms(admin, 'Thursday', '09:00', '10:00')
+
+    assert admin.delete(f'/api/classes/{class_id}').status_code == 200
+    assert 2 in _free_rooms(admin, 'Thursday', '09:00', '10:00')
@@ -0,0 +1,88 @@
+from models import db, Class
+
+
+def _subjects(app):
+    with app.app_context():
+        return {c.id: (c.subject, c.day, c.start_time.strftime('%H:%M'), c.module_id)
+                for c in db.session.query(Class)}
+
+
+def test_bulk_update(app, admin):
+    response = admin.post('/api/classes/bulk-update', json={'updates': [
+        {'id': 1, 'room_id': 1}, {'id': 2, 'room_id': 1}, {'id': 3, 'subject': 'ALGORITHMS'}]})
+    assert response.status_code == 200
+    assert response.get_json() == {'updated': 3, 'errors': []}
+    with app.app_context():
+        assert [c.room_id for c in db.session.query(Class).order_by(Class.id)] == [1, 1, 7]
+        assert db.session.get(Class, 3).subject == 'ALGORITHMS'
+
+
+def test_bulk_update_is_all_or_nothing(app, admin):
+    before = _subjects(app)
+    response = admin.post('/api/classes/bulk-update', json={'updates': [
+        {'id': 1, 'subject': 'HISTORY'}, {'id': 2, 'day': 'Funday'}, {'id': 99, 'subject': 'X'}]})
+    assert response.status_code == 400
+    assert [e['id'] for e in response.get_json()['errors']] == [2, 99]
+    assert _subjects(app) == before
+
+
+def test_bulk_update_checks_clashes_between_items(app, admin):
+    # Swapping the two Monday classes is fine; moving both onto one hour is not
+    response = admin.post('/api/classes/bulk-update', json={'updates': [
+        {'id': 1, 'start_time': '11:00', 'end_time': '12:00'},
+        {'id': 2, 'start_time': '10:00', 'end_time': '11:00'}]})
+    assert response.status_code == 200
+
+    response = admin.post('/api/classes/bulk-update', json={'updates': [
+        {'id': 1, 'day': 'Wednesday'}, {'id': 2, 'day': 'Wednesday', 'start_time': '11:00',
+                                         'end_time': '12:00'}, {'id': 3, 'day': 'Wednesday'}]})
+    assert response.status_code == 409
+    assert [e['id'] for e in response.get_json()['errors']] == [2]
+
+
+def test_bulk_delete(app, admin):
+    assert admin.post('/api/classes/bulk-delete', json={'ids': [1, 2]}).get_json() == {'deleted': 2, 'errors': []}
+    assert set(_subjects(app)) == {3}
+
+    response = admin.post('/api/classes/bulk-delete', json={'ids': [3, 42]})
+    assert response.status_code == 400
+    assert set(_subjects(app)) == {3}
+
+
+def test_bulk_delete_dry_run(app, admin):
+    assert admin.post('/api/classes/bulk-delete?dry_run=1', json={'ids': [1]}).get_json()['deleted'] == 0
+    assert set(_subjects(app)) == {1, 2, 3}
+
+
+def test_bulk_requests_are_validated(admin):
+    assert admin.post('/api/classes/bulk-delete', json={'ids': []}).status_code == 400
+    assert admin.post('/api/classes/bulk-delete', json={'ids': [1, 1]}).status_code == 400
+    assert admin.post('/api/classes/bulk-delete', json={'ids': ['1']}).status_code == 400
+    assert admin.post('/api/classes/bulk-update', json={'updates': [{'id': 1, 'color': 'red'}]}).status_code == 400
+
+
+def test_copy_week(app, admin):
+    response = admin.post('/api/classes/copy-week', json={
+        'branch_id': 1, 'module_id': 1, 'target_module_id': 2, 'day_shift': 1, 'time_shift': 60})
+    assert response.status_code == 201
+    assert response.get_json() == {'inserted': 3, 'replaced': 0, 'errors': []}
+    copies = sorted(v[1:] for v in _subjects(app).values() if v[3] == 2)
+    assert copies == [('Tuesday', '11:00', 2), ('Tuesday', '12:00', 2), ('Wednesday', '11:00', 2)]
+
+
+def test_copy_week_clash_writes_nothing(app, admin):
+    # Same instructors at the same times in another module
+    response = admin.post('/api/classes/copy-week', json={
+        'branch_id': 1, 'module_id': 1, 'target_module_id': 3})
+    assert response.status_code == 409
+    assert len(response.get_json()['errors']) == 3
+    assert len(_subjects(app)) == 3
+
+
+def test_copy_week_replace(app, admin):
+    admin.post('/api/classes/copy-week', json={'branch_id': 1, 'module_id': 1, 'target_module_id': 2,
+                                               'day_shift': 2})
+    response = admin.post('/api/classes/copy-week', json={'branch_id': 1, 'module_id': 1, 'target_module_id': 2,
+                                                          'day_shift': 3, 'replace': True})
+    assert response.get_json() == {'inserted': 3, 'replaced': 3, 'errors': []}
+    assert len(_subjects(app)) == 6
@@ -0,0 +1,38 @@
+from models import db
+from cache import cache
+
+
+def _written_by_another_process(app, sql):
+    # Plain SQL doesn't pass through this process's change tracking, like a write made elsewhere
+    with app.app_context():
+        db.session.execute(db.text(sql))
+        db.session.execute(db.text('UPDATE sync_state SET change_seq = change_seq + 1'))
+        db.session.commit()
+
+
+def test_own_writes_keep_the_process_in_sync(app, admin, physics):
+    admin.get('/api/classes')
+    changes = cache.external_changes
+    response = admin.post('/api/classes', json=physics)
+    assert response.status_code == 201
+
+    app.config['CACHE_VERSION_CHECK_SECONDS'] = 0
+    subjects = [c['subject'] for c in admin.get('/api/classes').get_json()]
+    assert 'PHYSICS' in subjects
+    assert cache.external_changes == changes
+
+
+def test_writes_from_other_processes_are_noticed(app, admin):
+    assert b'ECONOMICS' in admin.get('/dashboard').data
+    grid = admin.get('/api/grid?branch_id=1&year_id=1').get_json()
+    assert grid['grid']['Monday'][0][0]['subject'] == 'ECONOMICS'
+
+    _written_by_another_process(app, "UPDATE classes SET subject = 'HISTORY' WHERE id = 1")
+
+    # The dashboard is served from this process's caches until the version is checked again
+    assert b'HISTORY' not in admin.get('/dashboard').data
+
+    app.config['CACHE_VERSION_CHECK_SECONDS'] = 0
+    assert b'HISTORY' in admin.get('/dashboard').data
+    grid = admin.get('/api/grid?branch_id=1&year_id=1').get_json()
+    assert grid['grid']['Monday'][0][0]['subject'] == 'HISTORY'
@@ -0,0 +1,52 @@
+import pytest
+from models import db, Class
+
+def test_add_class(admin, physics):
+    assert admin.post('/api/classes', json=physics).status_code == 201
+    assert 'PHYSICS' in [c['subject'] for c in admin.get('/api/classes').get_json()]
+
+
+@pytest.mark.parametrize('clash', [
+    {'room_id': 6},  # ECONOMICS is in room 6 on Monday at 10
+    {'room_id': 1, 'instructor_id': 1},
+    {'room_id': 1, 'instructor_id': 3},  # same branch and module
+])
+def test_add_class_clash(admin, physics, clash):
+    response = admin.post('/api/classes', json=dict(physics, day='Monday', start_time='10:30',
+                                                    end_time='11:30', **clash))
+    assert response.status_code == 409
+    assert response.get_json()['conflicts']
+
+
+def test_back_to_back_classes_do_not_clash(admin, physics):
+    response = admin.post('/api/classes', json=dict(physics, day='Monday', start_time='09:00',
+                                                    end_time='10:00', room_id=6, instructor_id=1))
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize('start_time, end_time', [('nine', '10:00'), ('09:00', None), ('25:00', '26:00')])
+def test_add_class_invalid_time(admin, physics, start_time, end_time):
+    response = admin.post('/api/classes', json=dict(physics, start_time=start_time, end_time=end_time))
+    assert response.status_code == 400
+
+
+def test_update_class(app, admin):
+    response = admin.put('/api/classes/1', json={'start_time': '8 am', 'end_time': '9'})
+    assert response.status_code == 200
+    with app.app_context():
+        class_obj = db.session.get(Class, 1)
+        assert (class_obj.start_time.hour, class_obj.end_time.hour) == (8, 9)
+
+
+@pytest.mark.parametrize('change', [{'start_time': '9am-ish'}, {'end_time': '10'}, {'end_time': 1030}])
+def test_update_class_invalid_time(app, admin, change):
+    assert admin.put('/api/classes/1', json=change).status_code == 400
+    with app.app_context():
+        assert db.session.get(Class, 1).start_time.hour == 10
+
+
+def test_update_class_clash(admin):
+    # Move SOFTWARE ENGINEERING onto ECONOMICS' hour in the same room
+    response = admin.put('/api/classes/2', json={'start_time': '10:00', 'end_time': '11:00'})
+    assert response.status_code == 409
+    assert {c['id'] for c in response.get_json()['conflicts']} == {1}
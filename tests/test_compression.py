@@ -0,0 +1,93 @@
+import gzip
+import json
+import pytest
+from flask import Response
+from compression import compressor
+
+
+@pytest.fixture
+def small_threshold(monkeypatch):
+    # The seeded class list is well under the configured 1 KiB
+    monkeypatch.setattr(compressor, 'min_size', 100)
+
+
+def test_gzip_when_accepted(admin, small_threshold):
+    plain = admin.get('/api/classes', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_brotli_is_preferred_when_available(admin, small_threshold):
+    brotli = pytest.importorskip('brotli')
+    plain = admin.get('/api/classes').data
+
+    response = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain
+
+    response = admin.get('/api/classes', headers={'Accept-Encoding': 'br;q=0.5, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_small_bodies_are_sent_as_is(admin):
+    response = admin.get('/api/years', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < compressor.min_size
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_not_modified_is_not_encoded(admin, small_threshold):
+    etag = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b''
+
+
+def test_streamed_responses_pass_through(app, client):
+    body = json.dumps(list(range(2000))).encode()
+    app.add_url_rule('/streamed', 'streamed', lambda: Response(iter([body]), mimetype='application/json'))
+
+    response = client.get('/streamed', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == body
+
+
+def test_encoded_bodies_are_reused_per_etag(admin, small_threshold, monkeypatch):
+    calls = []
+    compress = compressor.compress
+    monkeypatch.setattr(compressor, 'compress', lambda data, encoding: calls.append(encoding) or compress(data, encoding))
+
+    first = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip'})
+    second = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip'})
+    assert first.data == second.data
+    assert calls == ['gzip']
+
+
+def test_compact_class_list(admin):
+    compact = admin.get('/api/classes?format=compact').get_json()
+    assert set(compact) == {'classes', 'rooms', 'instructors', 'modules', 'branches'}
+    assert compact['rooms'] == {'6': '228', '7': 'Lab 1'}
+    assert compact['instructors'] == {'1': 'Dr. GCR', '2': 'Dr. PSB'}
+    assert compact['modules'] == {'1': 'Semester 1'}
+    assert compact['branches'] == {'1': 'Computer Science'}
+    assert compact['classes'][0] == {'id': 1, 'subject': 'ECONOMICS', 'start_time': '10:00', 'end_time': '11:00',
+                                     'day': 'Monday', 'room_id': 6, 'instructor_id': 1, 'module_id': 1,
+                                     'branch_id': 1}
+
+    # The same classes as the full list, in the same order, with the names restored
+    full = admin.get('/api/classes').get_json()
+    assert [c['id'] for c in compact['classes']] == [c['id'] for c in full]
+    for short, long in zip(compact['classes'], full):
+        assert compact['rooms'][str(short['room_id'])] == long['room']
+        assert compact['instructors'][str(short['instructor_id'])] == long['instructor']
+
+
+def test_compact_list_is_filtered(admin):
+    compact = admin.get('/api/classes?format=compact&day=Tuesday').get_json()
+    assert [c['subject'] for c in compact['classes']] == ['DATA STRUCTURES']
+    assert compact['rooms'] == {'7': 'Lab 1'}
@@ -0,0 +1,65 @@
+from models import db
+from compression import compressor
+from tests.conftest import QueryCounter
+
+
+def test_unchanged_data_is_answered_with_304(admin):
+    first = admin.get('/api/classes')
+    etag = first.headers['ETag']
+
+    with QueryCounter() as counter:
+        second = admin.get('/api/classes', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert counter.count == 1  # the data version
+
+
+def test_etag_changes_with_a_write(admin, physics):
+    etag = admin.get('/api/classes').headers['ETag']
+    response = admin.post('/api/classes', json=physics)
+    assert response.status_code == 201
+
+    response = admin.get('/api/classes', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_changes_with_a_write_from_another_process(app, admin):
+    etag = admin.get('/api/classes').headers['ETag']
+    with app.app_context():
+        db.session.execute(db.text("UPDATE classes SET subject = 'HISTORY' WHERE id = 1"))
+        db.session.execute(db.text('UPDATE sync_state SET change_seq = change_seq + 1'))
+        db.session.commit()
+
+    # Even before this process's own caches would check the version again
+    response = admin.get('/api/classes', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['subject'] == 'HISTORY'
+
+
+def test_etag_differs_by_query(admin):
+    assert admin.get('/api/classes').headers['ETag'] != admin.get('/api/classes?day=Monday').headers['ETag']
+
+
+def test_etags_are_strong_per_encoding(admin, monkeypatch):
+    monkeypatch.setattr(compressor, 'min_size', 100)
+    plain = admin.get('/api/classes').headers['ETag']
+    assert not plain.startswith('W/')
+
+    encoded = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip'})
+    assert encoded.headers['Content-Encoding'] == 'gzip'
+    assert encoded.headers['ETag'] == plain[:-1] + '-gzip"'
+
+    for etag in (plain, encoded.headers['ETag']):
+        response = admin.get('/api/classes', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+
+def test_admin_lists_refuse_others_before_reading_the_version(student):
+    student.get('/api/classes')  # loads the session user
+    with QueryCounter() as counter:
+        response = student.get('/api/branches')
+    assert response.status_code == 403
+    assert 'ETag' not in response.headers
+    assert counter.count == 0, counter.statements
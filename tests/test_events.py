@@ -0,0 +1,48 @@
+import pytest
+from models import db
+from events import changes
+
+@pytest.fixture
+def live(app, monkeypatch):
+    app.config['LIVE_UPDATES'] = True
+    monkeypatch.setattr(changes, 'poll_seconds', 0.05)
+    monkeypatch.setattr(changes, 'max_stream_seconds', 5)
+    return app
+
+
+def _next_event(chunks):
+    for chunk in chunks:
+        chunk = chunk.decode()
+        if 'event:' in chunk:
+            return chunk
+    raise AssertionError('stream ended')
+
+
+def test_live_updates_are_off_by_default(admin):
+    assert admin.get('/api/changes').status_code == 204
+    assert b'data-change-id=""' in admin.get('/dashboard').data
+
+
+def test_stream_sends_this_processes_changes(live, admin, physics):
+    response = admin.get('/api/changes', buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks).decode().startswith('retry:')
+
+    assert admin.post('/api/classes', json=physics).status_code == 201
+    event = _next_event(chunks)
+    assert 'event: created' in event and 'PHYSICS' in event
+    response.close()
+
+
+def test_stream_resets_on_changes_from_other_workers(live, admin):
+    live.config['CACHE_VERSION_CHECK_SECONDS'] = 0
+    response = admin.get('/api/changes', buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+
+    with live.app_context():
+        db.session.execute(db.text("UPDATE classes SET subject = 'HISTORY' WHERE id = 1"))
+        db.session.execute(db.text('UPDATE sync_state SET change_seq = change_seq + 1'))
+        db.session.commit()
+    assert 'event: reset' in _next_event(chunks)
+    response.close()
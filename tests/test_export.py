@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+from datetime import date
+import pytest
+from models import db, User
+from export import ical_lines
+from queries import class_query
+from tests.conftest import ADMIN, login
+
+
+@pytest.fixture
+def own_class(app, physics):
+    """One Friday class for the student's branch"""
+    admin = app.test_client()
+    login(admin, *ADMIN)
+    assert admin.post('/api/classes', json=dict(physics, branch_id=2)).status_code == 201
+
+
+def _export(client, **args):
+    response = client.get('/api/classes/export', query_string=args)
+    assert response.status_code == 200
+    assert response.is_streamed
+    return response
+
+
+def test_ndjson_export(admin):
+    response = _export(admin, format='ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=timetable.ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert rows == admin.get('/api/classes').get_json()
+    assert rows[0] == {'id': 1, 'subject': 'ECONOMICS', 'start_time': '10:00', 'end_time': '11:00', 'day': 'Monday',
+                       'room': '228', 'instructor': 'Dr. GCR', 'module': 'Semester 1', 'branch': 'Computer Science'}
+
+
+def test_ndjson_is_the_default(admin):
+    assert _export(admin).mimetype == 'application/x-ndjson'
+
+
+def test_csv_export(admin):
+    response = _export(admin, format='csv', day='Monday')
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=timetable.csv'
+    text = response.get_data(as_text=True)
+    assert text.splitlines()[0] == 'id,subject,day,start_time,end_time,room,instructor,module,branch'
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [(row['subject'], row['start_time']) for row in rows] == [('ECONOMICS', '10:00'),
+                                                                     ('SOFTWARE ENGINEERING', '11:00')]
+
+
+def test_ics_export(admin, physics):
+    assert admin.post('/api/classes', json=dict(physics, subject='LAB; PART 1, 2')).status_code == 201
+    response = _export(admin, format='ics')
+    assert response.mimetype == 'text/calendar'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=timetable.ics'
+
+    text = response.get_data(as_text=True)
+    lines = text.split('\r\n')
+    assert lines[0] == 'BEGIN:VCALENDAR' and lines[-2] == 'END:VCALENDAR' and lines[-1] == ''
+    assert 'X-WR-CALNAME:CIT Routine - admin' in lines
+    assert text.count('BEGIN:VEVENT') == 4
+    assert 'RRULE:FREQ=WEEKLY;BYDAY=MO' in lines
+    assert 'RRULE:FREQ=WEEKLY;BYDAY=TU' in lines
+    assert 'SUMMARY:LAB\\; PART 1\\, 2' in lines
+
+
+def test_ics_events_fall_in_the_current_week(app, admin):
+    with app.app_context():
+        user = db.session.get(User, 1)
+        text = ''.join(ical_lines(class_query(user, day='Tuesday'), 'Test', today=date(2024, 5, 16)))
+    # 16 May 2024 was a Thursday; its week starts on Monday the 13th
+    assert 'DTSTART:20240514T100000\r\n' in text
+    assert 'DTEND:20240514T110000\r\n' in text
+    assert 'UID:class-3@cit-routine\r\n' in text
+
+
+def test_export_filters(admin):
+    rows = _export(admin, branch_id=2).get_data(as_text=True)
+    assert rows == ''
+    rows = _export(admin, day='Tuesday').get_data(as_text=True).splitlines()
+    assert [json.loads(row)['subject'] for row in rows] == ['DATA STRUCTURES']
+
+
+def test_students_export_only_their_own_classes(own_class, student):
+    rows = [json.loads(line) for line in _export(student).get_data(as_text=True).splitlines()]
+    assert [(row['subject'], row['branch']) for row in rows] == [('PHYSICS', 'Electronics & Communication')]
+
+    # Asking for another branch doesn't widen the scope
+    assert _export(student, branch_id=1).get_data(as_text=True) == ''
+
+
+def test_unknown_export_format(admin):
+    response = admin.get('/api/classes/export?format=xlsx')
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import json
+import pytest
+from models import db, Class
+
+
+def _import(client, body, content_type='application/json', **args):
+    return client.post('/api/classes/import', query_string=args,
+                       data=body if isinstance(body, str) else json.dumps(body), content_type=content_type)
+
+
+def test_import_json(app, admin):
+    response = _import(admin, [
+        {'subject': 'PHYSICS', 'day': 'friday', 'start_time': '9 am', 'end_time': '10 am',
+         'room': '101', 'instructor': 'Dr. RKS', 'module': 'Semester 1', 'branch': 'CS'},
+        {'subject': 'CHEMISTRY', 'day': 'Friday', 'time': '10 am - 11 am', 'room': '101'},
+    ], branch_id=1, module_id=1)
+    assert response.status_code == 200
+    assert response.get_json() == {'inserted': 2, 'valid': 2, 'errors': []}
+    with app.app_context():
+        assert db.session.query(Class).count() == 5
+
+
+def test_import_csv(admin):
+    body = 'subject,day,start_time,end_time,branch_id\nPHYSICS,Friday,09:00,10:00,1\n'
+    assert _import(admin, body, 'text/csv').get_json()['inserted'] == 1
+
+
+def test_import_reports_bad_rows(app, admin):
+    response = _import(admin, [
+        {'subject': 'PHYSICS', 'day': 'Friday', 'start_time': '09:00', 'end_time': '10:00'},
+        {'subject': 42, 'day': 'Friday', 'start_time': '10:00', 'end_time': '11:00'},
+        {'subject': ['A', 'B'], 'day': 'Friday', 'start_time': '11:00', 'end_time': '12:00'},
+        [1, 2],
+        {'subject': 'MATHS', 'day': 'Funday', 'start_time': '09:00', 'end_time': '10:00'},
+        {'subject': 'MATHS', 'day': 'Friday', 'start_time': '10:00', 'end_time': '09:00'},
+        {'subject': 'MATHS', 'day': 'Friday', 'start_time': '13:00', 'end_time': '14:00', 'room': 'Attic'},
+        {'subject': '', 'day': 'Friday', 'start_time': '13:00', 'end_time': '14:00'},
+        {'subject': 'ECONOMICS', 'day': 'Monday', 'start_time': '10:00', 'end_time': '11:00'},
+    ], branch_id=1, module_id=1)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['inserted'] == 3
+    errors = {e['row']: e['error'] for e in result['errors']}
+    assert errors == {
+        4: 'Row must be an object',
+        5: "Invalid day: 'Funday'",
+        6: 'Start time must be before end time',
+        7: "Unknown room: 'Attic'",
+        8: 'Missing subject',
+        9: 'Class clashes with existing classes',
+    }
+
+
+def test_import_dry_run_writes_nothing(app, admin):
+    response = _import(admin, [{'subject': 'PHYSICS', 'day': 'Friday', 'start_time': '09:00',
+                                'end_time': '10:00'}], branch_id=1, dry_run=1)
+    assert response.get_json() == {'inserted': 0, 'valid': 1, 'errors': []}
+    with app.app_context():
+        assert db.session.query(Class).count() == 3
+
+
+@pytest.mark.parametrize('body', ['{"classes": 5}', '5', '"text"', '{"a": 1}\nnot json'])
+def test_import_rejects_payloads_that_are_not_rows(admin, body):
+    response = _import(admin, body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('args, message', [({'branch_id': 999}, 'Unknown branch_id: 999'),
+                                           ({'branch_id': 1, 'module_id': 999}, 'Unknown module_id: 999')])
+def test_import_rejects_unknown_defaults(app, admin, args, message):
+    response = _import(admin, [{'subject': 'PHYSICS', 'day': 'Friday', 'start_time': '09:00',
+                                'end_time': '10:00'}], **args)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == message
+    with app.app_context():
+        assert db.session.query(Class).count() == 3
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import time
+import pytest
+from models import db, Class
+from pagination import encode_cursor, decode_cursor
+from queries import CLASS_ORDER
+from tests.conftest import QueryCounter
+
+
+@pytest.fixture
+def many_classes(app):
+    with app.app_context():
+        db.session.add_all(Class(subject=f'Subject {i}', start_time=time(8 + i % 9), end_time=time(9 + i % 9),
+                                 day=('Wednesday', 'Thursday', 'Friday')[i % 3], module_id=1,
+                                 branch_id=1 + i % 5) for i in range(40))
+        db.session.commit()
+
+
+def _token(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_cursor_round_trip(app):
+    with app.app_context():
+        values = [2, time(9, 30), 17]
+        assert decode_cursor(encode_cursor(values), CLASS_ORDER) == values
+
+
+def test_pages_walk_the_whole_list_in_order(admin, many_classes):
+    everything = [c['id'] for c in admin.get('/api/classes').get_json()]
+    assert len(everything) == 43
+
+    seen, cursor = [], None
+    while True:
+        page = admin.get('/api/classes', query_string={'limit': 10, 'cursor': cursor or ''}).get_json()
+        assert len(page['items']) <= 10
+        seen += [item['id'] for item in page['items']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == everything
+
+
+def test_last_full_page_has_no_cursor(admin):
+    page = admin.get('/api/classes?limit=3').get_json()
+    assert len(page['items']) == 3
+    assert page['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!', _token({'weekday': 0}), _token([0, '10:00:00']), _token([0, 'ten', 1]), 'W10',
+])
+def test_malformed_or_tampered_cursors_are_rejected(admin, cursor):
+    response = admin.get('/api/classes', query_string={'limit': 10, 'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+
+def test_fields_only_join_what_they_need(admin):
+    with QueryCounter() as counter:
+        page = admin.get('/api/classes?fields=id,subject,day').get_json()
+    assert page['items'][0] == {'id': 1, 'subject': 'ECONOMICS', 'day': 'Monday'}
+    assert not any('JOIN' in statement for statement in counter.statements if 'classes' in statement)
+
+    page = admin.get('/api/classes?fields=subject,room,start_time').get_json()
+    assert page['items'][0] == {'subject': 'ECONOMICS', 'room': '228', 'start_time': '10:00'}
+
+
+def test_unknown_fields_are_rejected(admin):
+    response = admin.get('/api/classes?fields=id,password_hash,secret')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown fields: password_hash, secret'
+
+
+@pytest.mark.parametrize('limit, status, count', [(1, 200, 1), (0, 400, None), (-5, 400, None), (5000, 200, 43)])
+def test_limit_bounds(admin, many_classes, limit, status, count):
+    response = admin.get(f'/api/classes?limit={limit}')
+    assert response.status_code == status
+    if count is not None:
+        assert len(response.get_json()['items']) == count
+
+
+def test_other_list_apis_page_too(admin):
+    page = admin.get('/api/instructors?fields=id,name,branch_name&limit=2').get_json()
+    assert page['items'] == [{'id': 1, 'name': 'Dr. GCR', 'branch_name': 'Computer Science'},
+                             {'id': 2, 'name': 'Dr. PSB', 'branch_name': 'Computer Science'}]
+    page = admin.get('/api/instructors', query_string={'limit': 2, 'cursor': page['next_cursor']}).get_json()
+    assert [item['id'] for item in page['items']] == [3, 4]
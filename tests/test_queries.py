@@ -0,0 +1,31 @@
+from datetime import time
+import pytest
+from models import db, Class
+from tests.conftest import QueryCounter
+
+
+# Cold: the session user and the classes with their related rows in one
+# joined query; the dashboard also loads the five dropdown tables. Warm:
+# nothing, besides the data version the API reads for its ETag.
+@pytest.mark.parametrize('path, cold_limit, warm_count', [('/api/classes', 3, 1), ('/dashboard', 7, 0)])
+def test_class_listing_query_count(admin, path, cold_limit, warm_count):
+    with QueryCounter() as cold:
+        assert admin.get(path).status_code == 200
+    assert cold.count <= cold_limit, cold.statements
+
+    with QueryCounter() as warm:
+        assert admin.get(path).status_code == 200
+    assert warm.count == warm_count, warm.statements
+
+
+def test_class_listing_does_not_grow_with_rows(app, admin):
+    with app.app_context():
+        db.session.add_all(Class(subject=f'Subject {i}', start_time=time(8 + i % 9), end_time=time(9 + i % 9),
+                                 day='Wednesday', room_id=1 + i % 8, instructor_id=1 + i % 4, module_id=1,
+                                 branch_id=1 + i % 5) for i in range(40))
+        db.session.commit()
+
+    with QueryCounter() as cold:
+        response = admin.get('/api/classes')
+    assert len(response.get_json()) == 43
+    assert cold.count <= 3, cold.statements
@@ -0,0 +1,73 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from models import create_schema
+from ratelimit import limiter, parse_limit, MemoryBackend
+from tests.conftest import login
+
+
+@pytest.fixture
+def limited(app, monkeypatch):
+    """Rate limiting on, with small limits, on the in-process backend"""
+    app.config['RATELIMIT_ENABLED'] = True
+    monkeypatch.setattr(limiter, 'backend', MemoryBackend())
+    for group, limit in {'login': '3/minute', 'login_address': '5/minute', 'read': '4/minute'}.items():
+        monkeypatch.setitem(limiter.limits, group, parse_limit(limit))
+    return app
+
+
+def _login(client, username, address='10.0.0.1'):
+    return client.post('/login', data={'username': username, 'password': 'wrong'},
+                       environ_base={'REMOTE_ADDR': address})
+
+
+def test_login_attempts_are_limited_per_username(limited, client):
+    assert [_login(client, 'alice').status_code for _ in range(3)] == [200, 200, 200]
+    response = _login(client, 'alice')
+    assert response.status_code == 429
+    assert response.mimetype == 'text/plain'
+    assert 1 <= int(response.headers['Retry-After']) <= 20
+
+    # Another student behind the same address still gets in
+    assert _login(client, 'bob').status_code == 200
+    # The same username from elsewhere has its own attempts
+    assert _login(client, 'alice', '10.0.0.2').status_code == 200
+
+
+def test_login_attempts_are_capped_per_address(limited, client):
+    codes = [_login(client, f'user{i}').status_code for i in range(6)]
+    assert codes == [200] * 5 + [429]
+    assert _login(client, 'user0', '10.0.0.2').status_code == 200
+
+
+def test_reads_are_limited_per_user(limited, client):
+    login(client, 'admin', 'admin123')
+    codes = [client.get('/api/dropdown-data').status_code for _ in range(5)]
+    assert codes == [200] * 4 + [429]
+    response = client.get('/api/classes')
+    assert response.get_json()['error'] == 'Too many requests'
+    assert response.headers['Retry-After']
+
+    assert limiter.stats()['read'] == {'allowed': 4, 'rejected': 2}
+    assert 'cit_rate_limited_total{endpoint="main.get_classes"} 1' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_limits_are_off_when_disabled(app, client):
+    assert not app.config['RATELIMIT_ENABLED']
+    assert all(_login(client, 'alice').status_code == 200 for _ in range(15))
+
+
+def test_client_address_from_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'PROXY_FIX_X_FOR', 1)
+    app = create_app('testing')
+    app.config['RATELIMIT_ENABLED'] = True
+    monkeypatch.setitem(limiter.limits, 'login', parse_limit('1/minute'))
+    with app.app_context():
+        create_schema()
+    client = app.test_client()
+
+    def attempt(forwarded_for):
+        return client.post('/login', data={'username': 'alice', 'password': 'wrong'},
+                           headers={'X-Forwarded-For': forwarded_for}).status_code
+
+    assert [attempt('192.0.2.1'), attempt('192.0.2.1'), attempt('192.0.2.2')] == [200, 429, 200]
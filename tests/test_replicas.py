@@ -0,0 +1,93 @@
+import pytest
+from app import create_app
+from config import TestingConfig
+from models import db, create_schema, seed_db
+from cache import cache, user_cache
+from grid import grids
+from availability import availability
+from replicas import replicas, sync_sqlite_replicas
+from tests.conftest import ADMIN, login
+
+# Paged reads skip the timetable cache, so every request shows which database answered
+CLASSES = '/api/classes?fields=id,subject&limit=100'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A primary and one replica, each a SQLite file, with the replica a copy of the primary"""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "primary.db"}')
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_BINDS', {'replica0': f'sqlite:///{tmp_path / "replica.db"}'})
+    # init_app registers a metadata per bind on the shared db; keep it out of later apps
+    monkeypatch.setattr(db, 'metadatas', dict(db.metadatas))
+    app = create_app('testing')
+    app.config['CACHE_VERSION_CHECK_SECONDS'] = 60
+    with app.app_context():
+        create_schema()
+        seed_db()
+        assert sync_sqlite_replicas(db) == ['replica0']
+        # Mark the replica's copy so responses show where they were read
+        with db.engines['replica0'].begin() as connection:
+            connection.execute(db.text("UPDATE classes SET subject = 'REPLICA ' || subject"))
+        cache.check_version(force=True)
+    # Seeding was a write; don't start out pinned to the primary
+    replicas.primary_until = 0.0
+    cache.invalidate()
+    user_cache.clear()
+    grids.reset()
+    availability.reset()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _reader(app):
+    client = app.test_client()
+    login(client, *ADMIN)
+    return client
+
+
+def _subjects(client):
+    response = client.get(CLASSES)
+    assert response.status_code == 200
+    return {item['subject'] for item in response.get_json()['items']}
+
+
+def test_reads_go_to_the_replica(app):
+    client = _reader(app)
+    before = replicas.stats()['reads']['replica0']
+    assert _subjects(client) == {'REPLICA ECONOMICS', 'REPLICA SOFTWARE ENGINEERING', 'REPLICA DATA STRUCTURES'}
+    assert replicas.stats()['reads']['replica0'] == before + 1
+
+
+def test_failed_replica_falls_back_to_the_primary(app):
+    client = _reader(app)
+    with app.app_context():
+        with db.engines['replica0'].begin() as connection:
+            connection.execute(db.text('DROP TABLE classes'))
+
+    assert 'ECONOMICS' in _subjects(client)
+    stats = replicas.stats()
+    assert stats['failovers'] == 1
+    assert 'replica0' in stats['down']
+
+    # The replica is skipped until REPLICA_RETRY_SECONDS have passed
+    reads = stats['reads']['primary']
+    assert 'ECONOMICS' in _subjects(client)
+    assert replicas.stats()['reads']['primary'] == reads + 1
+    assert replicas.stats()['failovers'] == 1
+
+
+def test_writers_read_their_own_writes(app, physics):
+    writer, other = _reader(app), _reader(app)
+    assert writer.post('/api/classes', json=physics).status_code == 201
+
+    # The replica hasn't seen PHYSICS; right after the write the whole process reads the primary
+    assert 'PHYSICS' in _subjects(writer)
+    assert 'PHYSICS' in _subjects(other)
+
+    # Once this process stops pinning reads, the writer's session still keeps it on the primary
+    replicas.primary_until = 0.0
+    assert 'PHYSICS' in _subjects(writer)
+    assert 'PHYSICS' not in _subjects(other)
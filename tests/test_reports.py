@@ -0,0 +1,66 @@
+import csv
+import io
+
+
+def _by_name(rows):
+    return {row['name']: row for row in rows}
+
+
+def test_instructor_workload(admin):
+    rows = admin.get('/api/reports/instructors').get_json()
+    assert [row['name'] for row in rows] == ['Dr. PSB', 'Dr. GCR', 'Dr. RKS', 'Dr. SKM']
+    psb = rows[0]
+    assert (psb['classes'], psb['days'], psb['weekly_hours'], psb['gap_hours']) == (2, 2, 2.0, 0)
+    assert _by_name(rows)['Dr. RKS'] == {'id': 3, 'name': 'Dr. RKS', 'branch': 'Electronics & Communication',
+                                         'classes': 0, 'days': 0, 'weekly_hours': 0, 'gap_hours': 0,
+                                         'longest_gap_minutes': 0}
+
+    rows = admin.get('/api/reports/instructors?branch_id=1').get_json()
+    assert [row['name'] for row in rows] == ['Dr. PSB', 'Dr. GCR']
+
+
+def test_instructor_gaps_are_measured_within_a_day(admin, physics):
+    # Dr. GCR teaches ECONOMICS on Monday 10-11; add 13-14 and 15:00-15:30
+    for start_time, end_time in (('13:00', '14:00'), ('15:00', '15:30')):
+        response = admin.post('/api/classes', json=dict(physics, day='Monday', instructor_id=1,
+                                                         start_time=start_time, end_time=end_time))
+        assert response.status_code == 201
+    # A Tuesday class follows Monday's last one but starts a new day
+    assert admin.post('/api/classes', json=dict(physics, day='Tuesday', instructor_id=1,
+                                                start_time='08:00', end_time='09:00')).status_code == 201
+
+    gcr = _by_name(admin.get('/api/reports/instructors').get_json())['Dr. GCR']
+    assert gcr['classes'] == 4
+    assert gcr['days'] == 2
+    assert gcr['weekly_hours'] == 3.5
+    assert gcr['gap_hours'] == 3.0
+    assert gcr['longest_gap_minutes'] == 120
+
+
+def test_room_utilization(admin):
+    rows = admin.get('/api/reports/rooms').get_json()
+    assert rows[0] == {'id': 6, 'name': '228', 'building': 'Building B', 'capacity': 50, 'classes': 2, 'days': 1,
+                       'weekly_hours': 2.0, 'occupancy_pct': 4.2, 'seat_hours': 100.0, 'gap_hours': 0,
+                       'longest_gap_minutes': 0}
+    lab = _by_name(rows)['Lab 1']
+    assert (lab['weekly_hours'], lab['occupancy_pct'], lab['seat_hours']) == (1.0, 2.1, 30.0)
+    assert _by_name(rows)['101']['occupancy_pct'] == 0
+
+
+def test_reports_as_csv(admin):
+    response = admin.get('/api/reports/rooms?format=csv')
+    assert response.mimetype == 'text/csv'
+    assert 'room-utilization.csv' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 8
+    assert rows[0]['name'] == '228' and rows[0]['occupancy_pct'] == '4.2'
+
+    response = admin.get('/api/reports/instructors?format=csv')
+    header = response.get_data(as_text=True).splitlines()[0]
+    assert header == 'id,name,branch,classes,days,weekly_hours,gap_hours,longest_gap_minutes'
+
+
+def test_reports_follow_writes(admin):
+    assert _by_name(admin.get('/api/reports/rooms').get_json())['228']['classes'] == 2
+    assert admin.delete('/api/classes/1').status_code == 200
+    assert _by_name(admin.get('/api/reports/rooms').get_json())['228']['classes'] == 1
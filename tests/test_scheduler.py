@@ -0,0 +1,44 @@
+import pytest
+
+REQUIREMENT = {'subject': 'PHYSICS', 'branch_id': 2, 'module_id': 3, 'hours': 4, 'instructor_id': 3}
+
+
+def test_generate(admin):
+    response = admin.post('/api/timetable/generate', json={'requirements': [dict(REQUIREMENT, max_per_day=1)]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert not result['unplaced']
+    assert len({c['day'] for c in result['classes']}) == 4
+
+
+@pytest.mark.parametrize('field, value', [
+    ('max_per_day', 'two'), ('max_per_day', -1), ('max_per_day', 0), ('max_per_day', True),
+    ('max_per_day', [1]), ('size', 'big'), ('size', -5),
+])
+def test_generate_rejects_invalid_requirement(admin, field, value):
+    response = admin.post('/api/timetable/generate', json={'requirements': [dict(REQUIREMENT, **{field: value})]})
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+@pytest.mark.parametrize('spec', [{'requirements': 5}, {'requirements': [[1, 2]]}, {'requirements': []}])
+def test_generate_rejects_invalid_spec(admin, spec):
+    assert admin.post('/api/timetable/generate', json=spec).status_code == 400
+
+
+@pytest.mark.parametrize('spec, message', [
+    ({'days': ['Monday', 'Monday']}, 'days'), ({'days': 5}, 'days'), ({'days': ['Someday']}, 'days'),
+    ({'slots': 5}, 'slots'), ({'time_budget': [1]}, 'time_budget'), ({'time_budget': 'soon'}, 'time_budget'),
+    ({'time_budget': -1}, 'time_budget'), ({'requirements': [dict(REQUIREMENT, instructor_id=[3])]}, 'instructor'),
+    ({'requirements': [dict(REQUIREMENT, instructor_id={'id': 3})]}, 'instructor'),
+])
+def test_generate_rejects_invalid_options(admin, spec, message):
+    spec.setdefault('requirements', [REQUIREMENT])
+    response = admin.post('/api/timetable/generate?commit=1', json=spec)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_generate_accepts_a_shorter_time_budget(admin):
+    response = admin.post('/api/timetable/generate', json={'requirements': [REQUIREMENT], 'time_budget': '0.5'})
+    assert response.status_code == 200
@@ -0,0 +1,26 @@
+from models import db, create_schema
+
+
+def _indexes(table):
+    return {i['name'] for i in db.inspect(db.engine).get_indexes(table)}
+
+
+def test_migration_drops_the_day_index(app):
+    with app.app_context():
+        db.session.execute(db.text('CREATE INDEX ix_classes_day ON classes (day)'))
+        db.session.commit()
+
+        create_schema()
+        assert 'ix_classes_day' not in _indexes('classes')
+        assert 'ix_classes_day_room_start' in _indexes('classes')
+
+
+def test_missing_indexes_are_created_on_existing_tables(app):
+    with app.app_context():
+        db.session.execute(db.text('DROP INDEX ix_users_role'))
+        db.session.execute(db.text('DROP INDEX ix_classes_branch_weekday_start'))
+        db.session.commit()
+
+        create_schema()
+        assert 'ix_users_role' in _indexes('users')
+        assert 'ix_classes_branch_weekday_start' in _indexes('classes')
@@ -0,0 +1,66 @@
+from models import db, Class, User
+from tests.conftest import login
+
+
+def _sync(client, token=None):
+    response = client.get('/api/sync', query_string={'since': token} if token else {})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_full_sync(admin):
+    result = _sync(admin)
+    assert result['full']
+    assert [c['subject'] for c in result['changes']['classes']] == ['ECONOMICS', 'SOFTWARE ENGINEERING',
+                                                                  'DATA STRUCTURES']
+    assert len(result['changes']['rooms']) == 8
+
+
+def test_delta_sync(admin):
+    token = _sync(admin)['token']
+    assert _sync(admin, token)['changes']['classes'] == []
+
+    admin.put('/api/classes/1', json={'subject': 'MICROECONOMICS'})
+    admin.delete('/api/classes/2')
+    admin.post('/api/rooms', json={'name': '301', 'building': 'Building D'})
+
+    result = _sync(admin, token)
+    assert not result['full']
+    assert [c['subject'] for c in result['changes']['classes']] == ['MICROECONOMICS']
+    assert [r['name'] for r in result['changes']['rooms']] == ['301']
+    assert result['deleted']['classes'] == [2]
+    assert result['changes']['branches'] == []
+
+    assert _sync(admin, result['token'])['changes']['classes'] == []
+
+
+def test_bulk_deletes_leave_tombstones(admin):
+    token = _sync(admin)['token']
+    assert admin.post('/api/classes/bulk-delete', json={'ids': [1, 3]}).status_code == 200
+    assert _sync(admin, token)['deleted']['classes'] == [1, 3]
+
+
+def test_classes_leaving_a_students_scope_are_deleted(app, admin):
+    with app.app_context():
+        student = User(username='student', role='student', branch_id=1, year_id=1)
+        student.set_password('student')
+        db.session.add(student)
+        db.session.commit()
+    student = app.test_client()
+    login(student, 'student', 'student')
+    token = _sync(student)['token']
+
+    admin.put('/api/classes/1', json={'branch_id': 2})
+    result = _sync(student, token)
+    assert result['deleted']['classes'] == [1]
+    assert result['changes']['classes'] == []
+    with app.app_context():
+        assert db.session.get(Class, 1).branch_id == 2
+
+
+def test_token_from_another_database_gets_a_full_sync(admin):
+    assert _sync(admin, 'deadbeef-5')['full']
+
+
+def test_invalid_token(admin):
+    assert admin.get('/api/sync?since=garbage').status_code == 400